@@ -0,0 +1,137 @@
+import asyncio
+import time
+from collections import deque
+from starlette.datastructures import MutableHeaders
+from fastapi.responses import JSONResponse
+from metrics import ADMISSION_QUEUE_TIME, ADMISSION_REJECTED
+from settings import (
+    ADMISSION_ENABLED, ADMISSION_AUTH_LIMIT, ADMISSION_READ_LIMIT, ADMISSION_WRITE_LIMIT,
+    ADMISSION_AUTH_QUEUE, ADMISSION_READ_QUEUE, ADMISSION_WRITE_QUEUE, ADMISSION_MAX_WAIT_MS, ADMISSION_RETRY_AFTER
+)
+
+# Контроль допуска: у входа, регистрации и обновления токена, у чтений и у записей
+# свои лимиты одновременных запросов и своя короткая очередь. Когда очередь полна
+# или запрос прождал в ней дольше ADMISSION_MAX_WAIT_MS, он сразу получает отказ
+# с Retry-After, а не висит в неограниченной очереди пула потоков. Так перегрузка
+# входа или тяжелых списков не тормозит остальные классы маршрутов
+
+AUTH_PATHS = frozenset({"/api/login", "/api/register", "/api/token/refresh"})
+# Дешевые ответы из памяти и служебные страницы не ограничиваются
+EXEMPT_PATHS = frozenset({"/", "/categories/", "/categories/summary", "/metrics", "/docs", "/redoc", "/openapi.json"})
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def route_class(scope):
+    path = scope["path"]
+    if scope["method"] == "OPTIONS" or path in EXEMPT_PATHS or path.endswith("/comments/live"):
+        # SSE-потоки живут минутами и ограничены своим LIVE_MAX_SUBSCRIBERS
+        return None
+    if path in AUTH_PATHS:
+        return "auth"
+    return "read" if scope["method"] in READ_METHODS else "write"
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+class Budget:
+    # Семафор с ограниченной FIFO-очередью; живет в цикле событий, блокировки не нужны
+    def __init__(self, name: str, limit: int, queue: int, max_wait: float, status: int):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait
+        self.status = status
+        self.active = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return 0.0
+
+        if len(self._waiters) >= self.queue:
+            raise Rejected("queue_full")
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except BaseException as exc:
+            # Тайм-аут или отмена запроса (клиент ушел)
+            if waiter.done() and not waiter.cancelled():
+                # Слот успели передать в последний момент: отдаем его дальше
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                raise Rejected("timeout")
+            raise
+        return time.perf_counter() - started
+
+    def release(self):
+        # Слот переходит первому живому ожидающему, иначе освобождается
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+# Вход упирается в пул хеширования паролей, поэтому отказ там - 429: клиенту стоит
+# повторить позже, а не сразу; перегрузку чтений и записей честнее отдать как 503
+BUDGETS = {
+    "auth": Budget("auth", ADMISSION_AUTH_LIMIT, ADMISSION_AUTH_QUEUE, ADMISSION_MAX_WAIT_MS / 1000, 429),
+    "read": Budget("read", ADMISSION_READ_LIMIT, ADMISSION_READ_QUEUE, ADMISSION_MAX_WAIT_MS / 1000, 503),
+    "write": Budget("write", ADMISSION_WRITE_LIMIT, ADMISSION_WRITE_QUEUE, ADMISSION_MAX_WAIT_MS / 1000, 503),
+}
+
+
+def stats():
+    return {
+        name: {"active": budget.active, "waiting": len(budget._waiters), "limit": budget.limit, "queue": budget.queue}
+        for name, budget in BUDGETS.items()
+    }
+
+
+class AdmissionMiddleware:
+    # Чистый ASGI, как и JWTAuthMiddleware; время в очереди уходит в Server-Timing и в метрики
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not ADMISSION_ENABLED or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        name = route_class(scope)
+        if name is None:
+            return await self.app(scope, receive, send)
+
+        budget = BUDGETS[name]
+        try:
+            waited = await budget.acquire()
+        except Rejected as exc:
+            ADMISSION_REJECTED.labels(name, exc.reason).inc()
+            response = JSONResponse(
+                {"detail": "Server is busy, try again later"},
+                status_code=budget.status,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)}
+            )
+            return await response(scope, receive, send)
+
+        ADMISSION_QUEUE_TIME.labels(name).observe(waited)
+
+        async def send_with_queue_time(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", f"queue;dur={waited * 1000:.2f}")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_queue_time)
+        finally:
+            budget.release()
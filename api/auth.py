@@ -1,11 +1,20 @@
 from fastapi import Request, HTTPException, Depends
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.responses import JSONResponse
+from starlette.requests import HTTPConnection
+import asyncio
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
 from datetime import datetime, timedelta
-from database.database import get_db
+from database.database import get_db, get_async_db
 from database.models import User
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from settings import HASH_POOL_SIZE, HASH_QUEUE_LIMIT, TOKEN_CACHE_SIZE
 
 SECRET_KEY = "KEY"
 ALGORITHM = "HS256"
@@ -26,6 +35,50 @@ class SimplePasswordHasher:
 
 pwd_context = SimplePasswordHasher()
 
+# PBKDF2 на миллион раундов занимает сотни миллисекунд CPU,
+# поэтому считаем его в отдельных процессах, а не в event loop
+_hash_pool = None
+_hash_pending = 0
+
+
+def _get_hash_pool():
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=HASH_POOL_SIZE,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = None
+
+
+def hash_queue_depth():
+    return _hash_pending
+
+
+async def _run_hasher(func, *args):
+    global _hash_pending
+    # Очередь ограничена: лучше быстро отказать, чем держать запрос минутами
+    if _hash_pending >= HASH_POOL_SIZE + HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"}
+        )
+
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_pool(), func, *args)
+    finally:
+        _hash_pending -= 1
+
 def verify_jwt(token: str):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -71,72 +124,118 @@ def verify_refresh_token(token: str):
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user_by_username(db, username)
+async def get_user_by_username_async(db: AsyncSession, username: str):
+    return (await db.execute(select(User).where(User.username == username))).scalars().first()
+
+async def _check_password(user, password: str):
     if not user:
         return False
     
-    if not pwd_context.verify(password, user.password):
+    if not await _run_hasher(SimplePasswordHasher.verify, password, user.password):
         return False
     return user
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def authenticate_user(db: Session, username: str, password: str):
+    return await _check_password(get_user_by_username(db, username), password)
 
-async def get_current_user(request: Request, db: Session = Depends(get_db)):
-    access_token = None
-    auth_header = request.headers.get("Authorization")
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    return await _check_password(await get_user_by_username_async(db, username), password)
+
+async def get_password_hash(password):
+    return await _run_hasher(SimplePasswordHasher.hash, password)
+
+def _extract_token(conn: HTTPConnection):
+    auth_header = conn.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
-        access_token = auth_header.split(" ")[1]
+        return auth_header.split(" ")[1]
+    return conn.cookies.get("access_token")
 
-    if not access_token:
-        access_token = request.cookies.get("access_token")
-    
-    if not access_token:
-        raise HTTPException(status_code=401, detail="Missing token")
 
-    payload = verify_jwt(access_token)
-    if not payload or payload.get("type") != "access":
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    
-    user_id = payload.get("user_id")
+# Уже проверенные access-токены: повторная проверка подписи не нужна до истечения exp
+_token_cache = OrderedDict()
+
+
+def verify_jwt_cached(token: str):
+    payload = _token_cache.get(token)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            _token_cache.move_to_end(token)
+            return payload
+        del _token_cache[token]
+
+    payload = verify_jwt(token)
+    if payload and "exp" in payload:
+        _token_cache[token] = payload
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return payload
+
+
+def _request_claims(request: Request):
+    # Middleware уже проверил токен и положил claims в scope
+    payload = getattr(request.state, "user", None)
+
+    if payload is None:
+        access_token = _extract_token(request)
+        if not access_token:
+            raise HTTPException(status_code=401, detail="Missing token")
+
+        payload = verify_jwt_cached(access_token)
+        if not payload:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    return payload
+
+
+async def get_current_user(request: Request, db: Session = Depends(get_db)):
+    user_id = _request_claims(request).get("user_id")
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     
     return user
 
-class JWTAuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+
+async def get_current_user_async(request: Request, db: AsyncSession = Depends(get_async_db)):
+    user_id = _request_claims(request).get("user_id")
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    return user
+
+
+# Публичные эндпоинты (без аутентификации)
+PUBLIC_PATHS = frozenset({
+    "/docs", "/redoc", "/openapi.json",
+    "/api/register", "/api/login", "/api/token/refresh",
+    "/", "/categories/", "/categories/summary",
+    # Prometheus ходит без JWT; доступ к /metrics ограничивается на прокси
+    "/metrics"
+})
+
+
+class JWTAuthMiddleware:
+    # Чистый ASGI: без BaseHTTPMiddleware не создаются лишние задачи и потоки тела
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
         # РАЗРЕШАЕМ OPTIONS ЗАПРОСЫ (CORS preflight)
-        if request.method == "OPTIONS":
-            return await call_next(request)
-            
-        # Публичные эндпоинты (без аутентификации)
-        public_paths = [
-            "/docs", "/redoc", "/openapi.json", 
-            "/api/register", "/api/login", "/api/token/refresh", 
-            "/", "/categories/"
-        ]
-        
-        if request.url.path in public_paths:
-            return await call_next(request)
-            
-        # Для защищенных эндпоинтов проверяем токен
-        access_token = None
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            access_token = auth_header.split(" ")[1]
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in PUBLIC_PATHS:
+            return await self.app(scope, receive, send)
 
+        # Для защищенных эндпоинтов проверяем токен
+        access_token = _extract_token(HTTPConnection(scope))
         if not access_token:
-            access_token = request.cookies.get("access_token")
-        
-        if not access_token:
-            raise HTTPException(status_code=401, detail="Missing token")
+            response = JSONResponse({"detail": "Missing token"}, status_code=401)
+            return await response(scope, receive, send)
 
-        payload = verify_jwt(access_token)
-        if not payload or payload.get("type") != "access":
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-        
-        request.state.user = payload
-        return await call_next(request)
\ No newline at end of file
+        payload = verify_jwt_cached(access_token)
+        if not payload:
+            response = JSONResponse({"detail": "Invalid or expired token"}, status_code=401)
+            return await response(scope, receive, send)
+
+        # Доступно как request.state.user
+        scope.setdefault("state", {})["user"] = payload
+        await self.app(scope, receive, send)
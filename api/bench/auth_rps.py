@@ -0,0 +1,41 @@
+# Пропускная способность защищенного маршрута (проверка JWT на каждом запросе).
+# Запуск из каталога api на копии базы:
+#   DATABASE_URL=sqlite:////tmp/bench.sqlite3 python -m bench.auth_rps
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from auth import create_access_token
+from main import app
+
+
+async def worker(client, url, headers, deadline):
+    done = 0
+    while time.perf_counter() < deadline:
+        await client.get(url, headers=headers)
+        done += 1
+    return done
+
+
+async def run(url, concurrency, duration):
+    headers = {"Authorization": "Bearer " + create_access_token(1, "bench")}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            status = (await client.get(url, headers=headers)).status_code
+            deadline = time.perf_counter() + duration
+            counts = await asyncio.gather(*(worker(client, url, headers, deadline) for _ in range(concurrency)))
+
+    return {"url": url, "status": status, "concurrency": concurrency, "rps": round(sum(counts) / duration, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="/articles/?limit=10")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.url, args.concurrency, args.duration))))
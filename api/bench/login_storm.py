@@ -0,0 +1,86 @@
+# Задержка /articles/ во время волны логинов.
+# Запуск из каталога api на копии базы:
+#   DATABASE_URL=sqlite:////tmp/bench.sqlite3 python -m bench.login_storm
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+from database.database import engine, session
+from database.models import Base, User
+from auth import SimplePasswordHasher, create_access_token
+from main import app
+
+USERNAME = "bench_login"
+PASSWORD = "bench_password"
+
+
+def ensure_user():
+    Base.metadata.create_all(engine, tables=[User.__table__])
+    db = session()
+    try:
+        user = db.query(User).filter(User.username == USERNAME).first()
+        if not user:
+            user = User(username=USERNAME, email=f"{USERNAME}@example.com",
+                        password=SimplePasswordHasher.hash(PASSWORD))
+            db.add(user)
+            db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def summarize(latencies):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+async def browse(client, headers, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await client.get("/articles/?limit=10", headers=headers)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def login_storm(client, logins):
+    credentials = {"username": USERNAME, "password": PASSWORD}
+    responses = await asyncio.gather(*(client.post("/api/login", json=credentials) for _ in range(logins)))
+    return [response.status_code for response in responses]
+
+
+async def run(logins, duration):
+    user_id = ensure_user()
+    headers = {"Authorization": "Bearer " + create_access_token(user_id, USERNAME)}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            idle = await browse(client, headers, duration)
+            storm, statuses = await asyncio.gather(
+                browse(client, headers, duration),
+                login_storm(client, logins)
+            )
+
+    return {
+        "idle": summarize(idle),
+        "login_storm": summarize(storm),
+        "logins": {str(code): statuses.count(code) for code in set(statuses)},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args.logins, args.duration)), indent=2))
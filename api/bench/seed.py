@@ -0,0 +1,142 @@
+# Детерминированный генератор данных для бенчмарков: одинаковые --seed и --scale
+# дают одинаковую базу. Пишет только в указанный файл, рабочую базу не трогает.
+# Запуск из каталога api:
+#   python -m bench.seed --database /tmp/bench.sqlite3 --scale 100k
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+# users, posts, comments; масштаб назван по самой большой таблице
+SCALES = {
+    "1k": (50, 200, 1_000),
+    "10k": (200, 1_000, 10_000),
+    "100k": (1_000, 10_000, 100_000),
+    "1m": (10_000, 100_000, 1_000_000),
+}
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench_password"
+CATEGORIES = ["technology", "programming", "science", "other"]
+CHUNK = 10_000
+START = datetime.datetime(2024, 1, 1)
+
+WORDS = (
+    "api база данных запрос индекс кэш сервер клиент поток очередь транзакция python sqlite "
+    "fastapi react блог пост комментарий категория поиск страница курсор задержка нагрузка "
+    "память процесс воркер метрика профиль тест сеть диск журнал версия схема миграция "
+    "latency throughput cache index query async await session engine pool worker"
+).split()
+
+
+def text_of(rng: random.Random, low: int, high: int):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _users(rng, count, bench_hash, shared_hash):
+    yield {"id": 1, "username": BENCH_USER, "email": f"{BENCH_USER}@example.com", "password": bench_hash,
+           "is_superuser": False, "is_staff": False, "is_active": True, "date_joined": START,
+           "first_name": "", "last_name": ""}
+    for id in range(2, count + 1):
+        # Настоящий PBKDF2 на миллион раундов для каждого пользователя занял бы часы
+        yield {"id": id, "username": f"user{id}", "email": f"user{id}@example.com", "password": shared_hash,
+               "is_superuser": False, "is_staff": False, "is_active": True,
+               "date_joined": START + datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+               "first_name": "", "last_name": ""}
+
+
+def _posts(rng, count, users, excerpt_length):
+    # Равномерно по году, id растет вместе с датой, как при обычной работе блога
+    step = 365 * 24 * 3600 / count
+    for id in range(1, count + 1):
+        content = text_of(rng, 50, 300)
+        yield {"id": id, "title": text_of(rng, 3, 8), "content": content, "excerpt": content[:excerpt_length],
+               "category": rng.choice(CATEGORIES), "author_id": rng.randint(1, users),
+               "created_at": START + datetime.timedelta(seconds=id * step), "comments_count": 0}
+
+
+def _comments(rng, count, users, posts):
+    step = 365 * 24 * 3600 / posts
+    for id in range(1, count + 1):
+        # Свежие посты собирают больше комментариев
+        post_id = max(1, posts + 1 - int(rng.paretovariate(1.2))) if rng.random() < 0.3 else rng.randint(1, posts)
+        created_at = START + datetime.timedelta(seconds=post_id * step + rng.randint(60, 7 * 24 * 3600))
+        yield {"id": id, "text": text_of(rng, 5, 40), "author_id": rng.randint(1, users),
+               "post_id": post_id, "created_at": created_at}
+
+
+def seed(database: str, users: int, posts: int, comments: int, seed_value: int):
+    # Модули базы читают DATABASE_URL при импорте
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    from sqlalchemy import insert
+    from auth import SimplePasswordHasher
+    from database.database import engine
+    from database.migrations import migrate, reconcile_comment_counts
+    from database.models import Base, User, Post, Comment
+    from settings import EXCERPT_LENGTH
+
+    rng = random.Random(seed_value)
+    Base.metadata.create_all(engine)
+    bench_hash = SimplePasswordHasher.hash(BENCH_PASSWORD)
+    shared_hash = SimplePasswordHasher.hash(f"shared-{seed_value}")
+
+    timings = {}
+    with engine.begin() as conn:
+        for name, table, rows in (
+            ("users", User.__table__, _users(rng, users, bench_hash, shared_hash)),
+            ("posts", Post.__table__, _posts(rng, posts, users, EXCERPT_LENGTH)),
+            ("comments", Comment.__table__, _comments(rng, comments, users, posts)),
+        ):
+            started = time.perf_counter()
+            for chunk in _chunks(rows):
+                conn.execute(insert(table), chunk)
+            timings[name] = round(time.perf_counter() - started, 2)
+
+        reconcile_comment_counts(conn)
+
+    # Индексы, FTS и служебные таблицы - той же миграцией, что и при старте API
+    started = time.perf_counter()
+    migrate(engine)
+    timings["migrate"] = round(time.perf_counter() - started, 2)
+
+    return {"database": database, "seed": seed_value, "users": users, "posts": posts,
+            "comments": comments, "seconds": timings}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", required=True, help="путь к новому файлу SQLite")
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--posts", type=int)
+    parser.add_argument("--comments", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="перезаписать существующий файл")
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        if not args.force:
+            parser.error(f"{args.database} уже существует, добавьте --force")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+
+    users, posts, comments = SCALES[args.scale]
+    result = seed(
+        os.path.abspath(args.database),
+        args.users or users, args.posts or posts, args.comments or comments, args.seed
+    )
+    print(json.dumps(result, ensure_ascii=False))
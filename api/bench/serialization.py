@@ -0,0 +1,78 @@
+# Микробенчмарк сериализации списка постов: ORM + Pydantic + jsonable_encoder
+# против колонок + словарей + orjson (FAST_JSON=1). Запрос к базе и кодирование
+# меряются отдельно, результат - JSON с медианой и лучшим временем.
+# Запуск из каталога api на базе из bench.seed:
+#   python -m bench.serialization --database /tmp/bench.sqlite3 --limit 1000
+import argparse
+import json
+import os
+import statistics
+import time
+
+
+def measure(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(times) * 1000, 2), "best_ms": round(min(times) * 1000, 2)}
+
+
+def run(limit: int, repeat: int, summary: bool):
+    from database.database import session
+    from database.models import Post
+    from crud import queries
+    from fastjson import dumps
+
+    order = (Post.created_at.desc(), Post.id.desc())
+    models_stmt = queries.posts_select(summary).order_by(*order).limit(limit)
+    columns_stmt = queries.post_columns_select(summary).order_by(*order).limit(limit)
+    build = queries.post_summary if summary else queries.post_out
+
+    with session() as db:
+        def models_rows():
+            # Пустая identity map: ORM-объекты строятся заново, как в новом запросе
+            db.expunge_all()
+            return db.execute(models_stmt).all()
+
+        def columns_rows():
+            return db.execute(columns_stmt).all()
+
+        models = [build(*row) for row in models_rows()]
+        columns = [queries.row_dict(row) for row in columns_rows()]
+        identical = dumps(models, fast=False) == dumps(columns, fast=True)
+
+        result = {
+            "pydantic": {
+                "query": measure(models_rows, repeat),
+                "build": measure(lambda: [build(*row) for row in models_rows()], repeat),
+                "encode": measure(lambda: dumps(models, fast=False), repeat),
+                "total": measure(lambda: dumps([build(*row) for row in models_rows()], fast=False), repeat),
+            },
+            "fast": {
+                "query": measure(columns_rows, repeat),
+                "build": measure(lambda: [queries.row_dict(row) for row in columns_rows()], repeat),
+                "encode": measure(lambda: dumps(columns, fast=True), repeat),
+                "total": measure(lambda: dumps([queries.row_dict(row) for row in columns_rows()], fast=True), repeat),
+            },
+        }
+
+    result["rows"] = len(models)
+    result["identical_output"] = identical
+    result["speedup"] = round(result["pydantic"]["total"]["median_ms"] / result["fast"]["total"]["median_ms"], 2)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", required=True, help="база из python -m bench.seed")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--summary", action="store_true", help="превью вместо полного текста")
+    args = parser.parse_args()
+
+    # Модули базы читают DATABASE_URL при импорте
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+    report = {"limit": args.limit, "summary": args.summary, **run(args.limit, args.repeat, args.summary)}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
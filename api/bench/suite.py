@@ -0,0 +1,241 @@
+# Сценарии нагрузки против main.app: в процессе через ASGI-транспорт или через
+# настоящий uvicorn. Результат - JSON с p50/p95/p99 и пропускной способностью,
+# который можно сохранять и сравнивать между прогонами в CI.
+# Запуск из каталога api на базе из bench.seed:
+#   python -m bench.suite --database /tmp/bench.sqlite3 --target asgi --output result.json
+#   python -m bench.suite --database /tmp/bench.sqlite3 --target uvicorn --workers 2
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+import httpx
+from bench.seed import BENCH_USER, BENCH_PASSWORD, text_of
+
+
+# Каждый сценарий - функция, выбирающая следующий запрос: (метка, метод, url, json)
+def anonymous(rng, ctx):
+    # Без токена доступны только публичные страницы; остальное отвечает 401 из middleware
+    return rng.choice([
+        ("categories", "GET", "/categories/", None),
+        ("categories_summary", "GET", "/categories/summary", None),
+        ("articles_401", "GET", "/articles/?limit=10&summary=true", None),
+    ])
+
+
+def reads(rng, ctx):
+    roll = rng.random()
+    if roll < 0.3:
+        return "list_head", "GET", "/articles/?limit=10&summary=true", None
+    if roll < 0.45:
+        category = rng.choice(ctx["categories"])
+        return "list_category", "GET", f"/articles/category/{category}?limit=10&summary=true", None
+    if roll < 0.75:
+        return "post", "GET", f"/articles/{ctx['post_id'](rng)}", None
+    if roll < 0.9:
+        return "detail", "GET", f"/articles/{ctx['post_id'](rng)}/detail", None
+    if roll < 0.95:
+        return "popular", "GET", "/articles/popular?limit=10", None
+    return "search", "GET", f"/articles/search?q={rng.choice(['кэш', 'индекс', 'latency', 'воркер'])}", None
+
+
+def comment_storm(rng, ctx):
+    # Все пишут в несколько свежих постов и тут же их читают
+    post_id = ctx["max_post_id"] - rng.randint(0, 4)
+    if rng.random() < 0.7:
+        data = {"text": text_of(rng, 5, 20), "author_id": ctx["user_id"], "post_id": post_id}
+        return "create_comment", "POST", "/comments/", data
+    return "post_comments", "GET", f"/articles/{post_id}/comments?limit=20", None
+
+
+def login_storm(rng, ctx):
+    return "login", "POST", "/api/login", {"username": BENCH_USER, "password": BENCH_PASSWORD}
+
+
+SCENARIOS = {
+    "anonymous": (anonymous, False),
+    "reads": (reads, True),
+    "comment_storm": (comment_storm, True),
+    "login_storm": (login_storm, False),
+}
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    if len(latencies) < 2:
+        value = round(latencies[0] * 1000, 2) if latencies else None
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value, "max_ms": value}
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+    }
+
+
+def summarize(samples, elapsed):
+    # samples: (метка, статус, задержка)
+    statuses = Counter(str(status) for _, status, _ in samples)
+    by_label = defaultdict(list)
+    for label, _, latency in samples:
+        by_label[label].append(latency)
+
+    return {
+        "requests": len(samples),
+        # Ошибки - сбои соединения и 5xx; 4xx видны в statuses
+        "errors": sum(1 for _, status, _ in samples if status == 0 or status >= 500),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        **percentiles([latency for _, _, latency in samples]),
+        "statuses": dict(sorted(statuses.items())),
+        "endpoints": {label: {"requests": len(values), **percentiles(values)} for label, values in sorted(by_label.items())},
+    }
+
+
+async def worker(client, scenario, rng, ctx, headers, deadline, samples):
+    while time.perf_counter() < deadline:
+        label, method, url, data = scenario(rng, ctx)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, json=data, headers=headers)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        samples.append((label, status, time.perf_counter() - started))
+
+
+async def run_scenario(client, name, ctx, concurrency, duration, seed):
+    scenario, authenticated = SCENARIOS[name]
+    headers = {"Authorization": "Bearer " + ctx["token"]} if authenticated else {}
+    samples = []
+
+    # Прогрев: первые запросы заполняют кэши и пул соединений
+    await worker(client, scenario, random.Random(seed), ctx, headers, time.perf_counter() + min(1.0, duration / 10), [])
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        worker(client, scenario, random.Random(seed * 1000 + index), ctx, headers, deadline, samples)
+        for index in range(concurrency)
+    ))
+    return summarize(samples, time.perf_counter() - started)
+
+
+def load_context():
+    from sqlalchemy import func, select
+    from auth import create_access_token
+    from database.database import session
+    from database.models import Post, User, Comment
+
+    with session() as db:
+        user_id = db.scalar(select(User.id).where(User.username == BENCH_USER))
+        if user_id is None:
+            sys.exit("В базе нет пользователя bench: сначала python -m bench.seed")
+        min_id, max_id = db.execute(select(func.min(Post.id), func.max(Post.id))).one()
+        scale = {
+            "users": db.scalar(select(func.count()).select_from(User)),
+            "posts": db.scalar(select(func.count()).select_from(Post)),
+            "comments": db.scalar(select(func.count()).select_from(Comment)),
+        }
+        categories = list(db.scalars(select(Post.category).distinct()))
+
+    return {
+        "user_id": user_id,
+        "token": create_access_token(user_id, BENCH_USER),
+        "max_post_id": max_id,
+        # Чтения смещены к свежим постам, как у живого блога
+        "post_id": lambda rng: max(min_id, max_id - int(rng.expovariate(1 / 200))),
+        "categories": categories,
+        "scale": scale,
+    }
+
+
+async def run_asgi(names, ctx, args):
+    from main import app
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in names:
+                results[name] = await run_scenario(client, name, ctx, args.concurrency, args.duration, args.seed)
+    return results
+
+
+async def run_uvicorn(names, ctx, args):
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port),
+               "--workers", str(args.workers), "--log-level", "warning"]
+    server = subprocess.Popen(command, env=os.environ.copy())
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                sys.exit("uvicorn не запустился")
+
+            for name in names:
+                results[name] = await run_scenario(client, name, ctx, args.concurrency, args.duration, args.seed)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", required=True, help="база из python -m bench.seed")
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="через запятую: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1, help="только для --target uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="куда сохранить JSON (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    names = [name for name in args.scenarios.split(",") if name]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    # Модули базы читают DATABASE_URL при импорте; uvicorn получит его через окружение
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+    ctx = load_context()
+
+    runner = run_asgi if args.target == "asgi" else run_uvicorn
+    results = asyncio.run(runner(names, ctx, args))
+
+    from settings import DB_MODE
+    report = {
+        "target": args.target,
+        "workers": args.workers if args.target == "uvicorn" else 1,
+        "db_mode": DB_MODE,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "seed": args.seed,
+        "scale": ctx["scale"],
+        "python": platform.python_version(),
+        "scenarios": results,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
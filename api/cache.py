@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from fastapi import Response
+from settings import CACHE_MAXSIZE, CACHE_TTL, COMPRESS_MIN_SIZE
+from fastjson import dumps
+from compression import choose_encoding, compress, mark_encoded
+
+
+class CachedResponse:
+    # Храним уже закодированное тело: на попадании не нужны ни Pydantic, ни json.
+    # Сжатые варианты добавляются при первом запросе с нужным Accept-Encoding
+    __slots__ = ("body", "headers", "etag", "encoded")
+
+    def __init__(self, body: bytes, headers: None | dict = None):
+        self.body = body
+        self.headers = headers or {}
+        self.etag = None
+        self.encoded = {}
+
+    @classmethod
+    def from_data(cls, data, headers: None | dict = None):
+        return cls(dumps(data), headers)
+
+    def response(self, accept_encoding: None | str = None):
+        encoding = choose_encoding(accept_encoding) if len(self.body) >= COMPRESS_MIN_SIZE else None
+        if encoding is None:
+            return Response(self.body, media_type="application/json", headers=self.headers)
+
+        body = self.encoded.get(encoding)
+        if body is None:
+            # Гонка двух потоков безвредна: оба получат одинаковые байты
+            body = self.encoded[encoding] = compress(self.body, encoding)
+
+        headers = dict(self.headers)
+        mark_encoded(headers, encoding)
+        return Response(body, media_type="application/json", headers=headers)
+
+
+# LRU-кэш с TTL; записи сбрасываются по тегам из обработчиков записи
+class ResponseCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._tags = defaultdict(set)  # tag -> keys
+        # Синхронные обработчики выполняются в пуле потоков, поэтому общее состояние
+        # в памяти процесса (здесь и в catalog.py, view_counter.py) берется под блокировкой
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, etag: None | str = None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            # Устаревшая версия: данные поменял другой воркер или Django
+            stale = etag is not None and entry[2].etag != etag
+            if stale or entry[0] < time.monotonic():
+                self._remove(key)
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, tuple(tags), value)
+            for tag in tags:
+                self._tags[tag].add(key)
+
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+cache = ResponseCache(CACHE_MAXSIZE, CACHE_TTL)
+
+
+def post_tag(id: int):
+    return f"post:{id}"
+
+
+def comments_tag(post_id: int):
+    return f"comments:{post_id}"
+
+
+def list_tag(category: None | str, head: bool = False):
+    # Keyset-страницы после курсора не сдвигаются при добавлении нового поста,
+    # поэтому новые посты затрагивают только первые страницы списков
+    tag = f"list:{category or '*'}"
+    return tag + ":head" if head else tag
@@ -0,0 +1,89 @@
+import threading
+import time
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from database.models import Post
+from settings import CATALOG_TTL
+from crud.schemas import CategoryEnum
+
+
+# Каталог категорий в памяти: число постов и дата последнего по каждой категории.
+# Обработчики записи правят его точечно после commit; полная пересборка - один
+# GROUP BY по индексу (category, created_at) при старте, по TTL или после удаления
+# самого свежего поста категории. TTL подхватывает записи других воркеров и Django
+class CategoryCatalog:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._categories = {}  # category -> [count, latest created_at]
+        self._built_at = None
+        self._stale = True
+        # Счетчики категорий правят обработчики записи, а пересборка подменяет их целиком
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def rebuild(self, db: Session):
+        rows = db.execute(
+            select(Post.category, func.count(), func.max(Post.created_at)).group_by(Post.category)
+        ).all()
+        with self._lock:
+            self._categories = {category: [count, latest] for category, count, latest in rows}
+            self._built_at = time.monotonic()
+            self._stale = False
+            self.rebuilds += 1
+
+    def _ensure(self, db: Session):
+        with self._lock:
+            fresh = not self._stale and time.monotonic() - self._built_at < self.ttl
+        if not fresh:
+            self.rebuild(db)
+
+    def added(self, category: str, created_at):
+        with self._lock:
+            entry = self._categories.setdefault(category, [0, None])
+            entry[0] += 1
+            if created_at and (entry[1] is None or created_at > entry[1]):
+                entry[1] = created_at
+
+    def removed(self, category: str, created_at):
+        with self._lock:
+            entry = self._categories.get(category)
+            if entry is None:
+                self._stale = True
+                return
+            entry[0] -= 1
+            # Новую дату последнего поста без запроса не узнать
+            if entry[0] <= 0 or entry[1] is None or (created_at and created_at >= entry[1]):
+                self._stale = True
+
+    def moved(self, old: str, new: str, created_at):
+        if old != new:
+            self.removed(old, created_at)
+            self.added(new, created_at)
+
+    def names(self, db: Session):
+        # То же, что SELECT DISTINCT category: только категории, где есть посты
+        self._ensure(db)
+        with self._lock:
+            return [category for category, (count, _) in self._categories.items() if count > 0]
+
+    def summary(self, db: Session):
+        self._ensure(db)
+        with self._lock:
+            categories = {category: list(entry) for category, entry in self._categories.items()}
+
+        # Все категории из CategoryEnum, даже пустые, затем неизвестные (например, из Django)
+        order = [category.value for category in CategoryEnum]
+        order += sorted(category for category in categories if category not in order)
+
+        result = []
+        for category in order:
+            count, latest = categories.get(category, (0, None))
+            result.append({
+                "name": category,
+                "count": count,
+                "latest_at": latest.isoformat() if latest else None,
+            })
+        return result
+
+
+catalog = CategoryCatalog(CATALOG_TTL)
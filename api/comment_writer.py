@@ -0,0 +1,134 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from database.database import session, read_session
+from cache import cache
+from crud.batch import write_comment_group, publish_comment_group
+from crud.schemas import CommentCreate
+from metrics import COMMENT_BATCH_SIZE
+from settings import COMMENT_BATCH_MAX, COMMENT_BATCH_WINDOW_MS
+
+logger = logging.getLogger(__name__)
+
+# Групповой commit для комментариев (COMMENT_WRITER=group). SQLite пускает одного
+# писателя, поэтому при всплеске комментариев запросы стоят в очереди на блокировку
+# базы и падают с "database is locked". Здесь пишет один поток: он набирает вставки
+# и правки, пока не наберется COMMENT_BATCH_MAX или не пройдет окно в несколько
+# миллисекунд, и фиксирует их одной транзакцией. Каждый запрос ждет свой Future
+# и получает id только после commit
+
+
+class _Job:
+    __slots__ = ("kind", "data", "future")
+
+    def __init__(self, kind: str, data):
+        self.kind = kind
+        self.data = data
+        self.future = Future()
+
+
+class CommentWriter:
+    def __init__(self, max_batch: int, window: float):
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="comment-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        # Уже принятые записи дописываются до остановки
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def create(self, data: CommentCreate) -> Future:
+        return self._submit("create", data)
+
+    def update(self, id: int, text: None | str) -> Future:
+        return self._submit("edit", (id, text))
+
+    def _submit(self, kind: str, data):
+        self.start()
+        job = _Job(kind, data)
+        self._queue.put(job)
+        return job.future
+
+    def _collect(self, first: _Job):
+        jobs = [first]
+        deadline = time.monotonic() + self.window
+        while len(jobs) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if job is None:
+                return jobs, True
+            jobs.append(job)
+        return jobs, False
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            jobs, stopping = self._collect(job)
+            self._commit(jobs)
+            if stopping:
+                return
+
+    def _commit(self, jobs: list[_Job]):
+        creates = [job for job in jobs if job.kind == "create"]
+        edits = [job for job in jobs if job.kind == "edit"]
+        try:
+            with session() as db:
+                created, edited, (tags, rows, edit_ids) = write_comment_group(
+                    db, [job.data for job in creates], [job.data for job in edits]
+                )
+        except Exception as exc:
+            # Сюда попадают только сбои до commit: группа не записана, повтор ничего не задвоит
+            if len(jobs) > 1:
+                # Одна сбойная запись не должна ронять соседей: повторяем по одной
+                logger.warning("Comment group of %d failed, retrying one by one: %s", len(jobs), exc)
+                for job in jobs:
+                    self._commit([job])
+                return
+            jobs[0].future.set_exception(exc)
+            return
+
+        # Группа уже записана: дальше ошибки только логируются
+        COMMENT_BATCH_SIZE.observe(len(jobs))
+        try:
+            cache.invalidate(*tags)
+        except Exception:
+            logger.exception("Cache invalidation after comment group failed")
+
+        for job, result in zip(creates + edits, created + edited):
+            if isinstance(result, Exception):
+                job.future.set_exception(result)
+            else:
+                job.future.set_result(result)
+
+        try:
+            with read_session() as db:
+                publish_comment_group(db, rows, edit_ids)
+        except Exception:
+            logger.exception("Publishing live comments after comment group failed")
+
+
+writer = CommentWriter(COMMENT_BATCH_MAX, COMMENT_BATCH_WINDOW_MS / 1000)
@@ -0,0 +1,143 @@
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from settings import COMPRESS_MIN_SIZE, COMPRESS_GZIP_LEVEL, COMPRESS_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# В порядке предпочтения сервера при равном q в Accept-Encoding
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# SSE сжимать нельзя: прокси и браузеры ждут события сразу, а не блоками
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/html", "text/plain")
+
+
+def choose_encoding(accept_encoding: None | str):
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str):
+    if encoding == "br":
+        return brotli.compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    # wbits=31 - формат gzip, а не голый zlib
+    compressor = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class _StreamCompressor:
+    # Для потоковых ответов (NDJSON-выгрузка): каждый кусок сбрасывается сразу,
+    # чтобы клиент получал строки по мере чтения из базы
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=COMPRESS_BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(COMPRESS_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, body: bytes):
+        if self.encoding == "br":
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.compress(body) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def mark_encoded(headers, encoding: str):
+    headers["Content-Encoding"] = encoding
+    headers["Vary"] = "Accept-Encoding"
+    # Сжатое тело - другое представление, поэтому ETag становится слабым;
+    # If-None-Match сравнивается без учета W/
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        headers["ETag"] = "W/" + etag
+
+
+def _compressible(headers):
+    if "content-encoding" in headers:
+        # Например, ответ из кэша, уже сжатый заранее
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE)
+
+
+class CompressionMiddleware:
+    # Чистый ASGI: заголовки ответа придерживаются до первого куска тела,
+    # чтобы по его размеру решить, сжимать ли ответ
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        stream = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, stream, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is not None:
+                data = stream.chunk(body) if body else b""
+                if not more_body:
+                    data += stream.finish()
+                return await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+            headers = MutableHeaders(scope=start)
+            if start["status"] < 200 or start["status"] in (204, 304) or not _compressible(headers) \
+                    or (not more_body and len(body) < COMPRESS_MIN_SIZE):
+                passthrough = True
+                await send(start)
+                return await send(message)
+
+            mark_encoded(headers, encoding)
+            if not more_body:
+                data = compress(body, encoding)
+                headers["Content-Length"] = str(len(data))
+                await send(start)
+                return await send({"type": "http.response.body", "body": data})
+
+            # Длина потока заранее неизвестна
+            del headers["Content-Length"]
+            stream = _StreamCompressor(encoding)
+            await send(start)
+            await send({"type": "http.response.body", "body": stream.chunk(body), "more_body": True})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import get_async_db, get_async_read_db
+from database.models import User
+from crud.schemas import UserCreate, UserLogin, Token
+from crud.auth import validate_new_user, username_taken, build_user, issue_tokens, refresh_claims, user_info, logout
+from auth import (
+    authenticate_user_async,
+    get_password_hash,
+    get_user_by_username_async,
+    get_current_user_async
+)
+
+# Асинхронные версии маршрутов из crud/auth.py (DB_MODE=async)
+router = APIRouter(prefix="/api", tags=["authentication"])
+
+@router.post("/register", response_model=Token)
+async def register(
+    user_data: UserCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Проверяем, что пользователь не существует
+    existing_user = await get_user_by_username_async(db, user_data.username)
+    if existing_user:
+        raise username_taken()
+
+    validate_new_user(user_data)
+    # Соединение писателя не держим, пока считается хеш
+    await db.rollback()
+
+    # Создаем нового пользователя
+    hashed_password = await get_password_hash(user_data.password)
+    new_user = build_user(user_data, hashed_password)
+
+    db.add(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Пока считался хеш, то же имя успел занять параллельный запрос
+        await db.rollback()
+        raise username_taken()
+
+    return issue_tokens(response, new_user.id, new_user.username, access_httponly=True) # logout на react
+
+@router.post("/login", response_model=Token)
+async def login(
+    user_data: UserLogin,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    user = await authenticate_user_async(db, user_data.username, user_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password"
+        )
+
+    return issue_tokens(response, user.id, user.username)
+
+@router.post("/token/refresh", response_model=Token)
+async def refresh_token(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    payload = refresh_claims(request)
+
+    user_id = payload.get("user_id")
+    username = payload.get("username")
+
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+
+    return issue_tokens(response, user_id, username)
+
+# Выход не работает с базой, обработчик общий
+router.post("/logout")(logout)
+
+@router.get("/me")
+async def get_current_user_info(current_user: User = Depends(get_current_user_async)):
+    return user_info(current_user)
@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import Comment, Post
+from database.database import get_async_db
+from .schemas import CommentCreate, CommentUpdate, CommentBatchUpdate, BatchItemResult
+from . import batch, export
+from settings import COMMENTS_PAGE_MAX, COMMENT_WRITER
+from cache import cache, post_tag, comments_tag
+from etags import bump_async
+import live
+from comment_writer import writer
+import asyncio
+import datetime
+
+# Асинхронные версии маршрутов из crud/comments.py (DB_MODE=async)
+comment_router = APIRouter()
+
+
+@comment_router.get("/")
+async def get_comments(
+    response: Response,
+    limit: int = Query(COMMENTS_PAGE_MAX, ge=1, le=COMMENTS_PAGE_MAX),
+    cursor: None | int = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    stmt = select(Comment).where(Comment.id > (cursor or 0)).order_by(Comment.id).limit(limit + 1)
+    comments = (await db.execute(stmt)).scalars().all()
+    if len(comments) > limit:
+        comments = comments[:limit]
+        response.headers["X-Next-Cursor"] = str(comments[-1].id)
+    return comments
+
+
+@comment_router.get("/export")
+async def export_comments(post_id: None | int = None):
+    return export.ndjson_response_async(export.comments_export_select(post_id))
+
+
+@comment_router.post("/batch", response_model=list[BatchItemResult], status_code=status.HTTP_201_CREATED)
+async def create_comments_batch(items: list[CommentCreate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(batch.create_comments, items)
+
+
+@comment_router.put("/batch", response_model=list[BatchItemResult])
+async def update_comments_batch(items: list[CommentBatchUpdate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(batch.update_comments, items)
+
+
+@comment_router.delete("/batch", response_model=list[BatchItemResult])
+async def delete_comments_batch(ids: list[int], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(batch.delete_comments, ids)
+
+
+@comment_router.get("/{id}")
+async def get_comment(id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.get(Comment, id)
+
+
+@comment_router.delete("/{id}")
+async def comment_delete(id: int, db: AsyncSession = Depends(get_async_db)):
+    comment = await db.get(Comment, id)
+
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    await db.execute(
+        update(Post)
+        .where(Post.id == comment.post_id)
+        .values(comments_count=Post.comments_count - 1)
+    )
+    await db.delete(comment)
+    await bump_async(db, post_tag(comment.post_id), comments_tag(comment.post_id))
+    await db.commit()
+
+    cache.invalidate(post_tag(comment.post_id), comments_tag(comment.post_id))
+    live.publish_deleted(comment.post_id, id)
+    return
+
+
+@comment_router.put("/{id}")
+async def comment_update(id: int, data: CommentUpdate, db: AsyncSession = Depends(get_async_db)):
+    if COMMENT_WRITER == "group":
+        await asyncio.wrap_future(writer.update(id, data.text))
+        return
+
+    comment = await db.get(Comment, id)
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
+
+    if data.text is not None:
+        comment.text = data.text
+
+    await bump_async(db, comments_tag(comment.post_id))
+    await db.commit()
+
+    cache.invalidate(comments_tag(comment.post_id))
+    await db.run_sync(live.publish_comment, "updated", comment)
+    return
+
+
+@comment_router.post("/")
+async def create_comments(comment_data: CommentCreate, db: AsyncSession = Depends(get_async_db)):
+    if COMMENT_WRITER == "group":
+        return {"id": await asyncio.wrap_future(writer.create(comment_data))}
+
+    post = await db.get(Post, comment_data.post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    new_comment = Comment(
+        text=comment_data.text,
+        author_id=comment_data.author_id,
+        post_id=comment_data.post_id,
+        created_at=datetime.datetime.now()
+    )
+
+    # Счетчик обновляется в той же транзакции, что и вставка
+    post.comments_count = Post.comments_count + 1
+    db.add(new_comment)
+    await bump_async(db, post_tag(post.id), comments_tag(post.id))
+    await db.commit()
+
+    # Число комментариев показывается и в самом посте, и в списках
+    cache.invalidate(post_tag(post.id), comments_tag(post.id))
+    await db.run_sync(live.publish_comment, "created", new_comment)
+    return {"id": new_comment.id}
@@ -0,0 +1,252 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from .schemas import PostCreate, PostUpdate, PostOut, PostSummary, PostDetail, CategoryEnum, CommentOut
+from .schemas import PostBatchUpdate, BatchItemResult, PopularPost
+from . import queries, batch, export
+import datetime
+from database.database import get_async_db, async_read_session
+from database.models import Post, User
+from settings import ARTICLES_PAGE_MAX, ARTICLES_PAGE_SIZE, EXCERPT_LENGTH, SEARCH_PAGE_MAX, COMMENTS_PAGE_MAX, DETAIL_COMMENTS, POPULAR_TOP_K
+from cache import cache, CachedResponse, post_tag, comments_tag, list_tag
+from catalog import catalog
+from view_counter import view_counter
+import live
+from fastjson import json_response
+from etags import bump_async, version_async, make_etag, conditional_async
+
+# Асинхронные версии маршрутов из crud/post.py (DB_MODE=async)
+post_router = APIRouter()
+
+
+@post_router.get("/search", response_model=list[PostSummary])
+async def search_articles(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    in_comments: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Маршрут объявлен раньше /{id}, иначе "search" уйдет в валидацию id
+    if not q.split():
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+
+    rows = (await db.execute(queries.search_select(q, limit, offset, in_comments))).all()
+    items, headers = queries.search_page(rows, limit, offset)
+    return json_response(items, headers)
+
+
+@post_router.get("/export")
+async def export_articles(category: None | str = None):
+    # Все посты одним потоком NDJSON, без сборки списка в памяти
+    return export.ndjson_response_async(export.posts_export_select(category))
+
+
+@post_router.get("/popular", response_model=list[PopularPost])
+async def get_popular_articles(
+    limit: int = Query(10, ge=1, le=POPULAR_TOP_K),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return json_response(await db.run_sync(view_counter.popular, limit))
+
+
+@post_router.get("/batch", response_model=list[PostOut])
+async def get_articles_batch(ids: str = Query(..., min_length=1), db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(batch.get_posts, batch.parse_ids(ids))
+
+
+@post_router.post("/batch", response_model=list[BatchItemResult], status_code=status.HTTP_201_CREATED)
+async def create_articles_batch(items: list[PostCreate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(batch.create_posts, items)
+
+
+@post_router.put("/batch", response_model=list[BatchItemResult])
+async def update_articles_batch(items: list[PostBatchUpdate], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(batch.update_posts, items)
+
+
+@post_router.delete("/batch", response_model=list[BatchItemResult])
+async def delete_articles_batch(ids: list[int], db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(batch.delete_posts, ids)
+
+
+@post_router.get("/{id}", response_model=PostOut)
+async def get_article(id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    key = ("article", id)
+
+    async def build():
+        row = (await db.execute(queries.post_select(id))).first()
+
+        if not row:
+            raise HTTPException(status_code=404, detail="Статья не найдена")
+
+        post, author_name = row
+        if author_name is None:
+            raise HTTPException(status_code=404, detail="Автор не найден")
+
+        return CachedResponse.from_data(queries.post_out(post, author_name)), [post_tag(id)]
+
+    etag = make_etag(key, await version_async(db, post_tag(id)))
+    response = await conditional_async(request, key, etag, build)
+    view_counter.hit(id)
+    return response
+
+
+@post_router.get("/", response_model=list[PostOut] | list[PostSummary])
+@post_router.get("/category/{category}", response_model=list[PostOut] | list[PostSummary])
+async def get_articles(
+    request: Request,
+    category: None | str = None,
+    limit: int = Query(ARTICLES_PAGE_SIZE, ge=1, le=ARTICLES_PAGE_MAX),
+    cursor: None | str = None,
+    summary: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    key = ("articles", category, limit, cursor, summary)
+
+    async def build():
+        rows = (await db.execute(queries.articles_select(category, limit, cursor, summary))).all()
+        return queries.articles_page(rows, category, limit, cursor, summary)
+
+    stamp = (await db.execute(queries.list_stamp_select(category, limit, cursor))).one()
+    return await conditional_async(request, key, make_etag(key, *stamp), build)
+
+
+@post_router.post("/", response_model=PostOut, status_code=status.HTTP_201_CREATED)
+async def create_articles(post_data: PostCreate, db: AsyncSession = Depends(get_async_db)):
+    author = await db.get(User, post_data.author_id)
+
+    if not author:
+        raise HTTPException(status_code=404)
+
+    if not post_data.category in [category.value for category in CategoryEnum]:
+        raise HTTPException(status_code=404)
+
+    created_at = datetime.datetime.now()
+    new_post = Post(
+        title = post_data.title,
+        content = post_data.content,
+        category = post_data.category,
+        author_id = post_data.author_id,
+        excerpt = post_data.content[:EXCERPT_LENGTH],
+        created_at = created_at
+    )
+
+    db.add(new_post)
+    await bump_async(db, list_tag(None), list_tag(post_data.category))
+    await db.commit()
+
+    cache.invalidate(list_tag(None, head=True), list_tag(post_data.category, head=True))
+    catalog.added(post_data.category, created_at)
+
+    return queries.post_out(*(await db.execute(queries.post_select(new_post.id))).one())
+
+
+@post_router.put("/{id}", response_model=PostOut)
+async def update_article(id: int, data: PostUpdate, db: AsyncSession = Depends(get_async_db)):
+    post = await db.get(Post, id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Статья не найдена")
+
+    if data.title is not None:
+        post.title = data.title
+    if data.content is not None:
+        post.content = data.content
+        post.excerpt = data.content[:EXCERPT_LENGTH]
+    old_category, created_at = post.category, post.created_at
+    category_changed = data.category is not None and data.category != post.category
+    if data.category is not None:
+        post.category = data.category
+
+    # Состав списков меняется только при переносе в другую категорию
+    await bump_async(db, post_tag(id), *([list_tag(old_category), list_tag(data.category)] if category_changed else []))
+    await db.commit()
+
+    cache.invalidate(post_tag(id))
+    if category_changed:
+        # Пост мог попасть на любую страницу списков новой категории
+        cache.invalidate(list_tag(data.category))
+        catalog.moved(old_category, data.category, created_at)
+
+    # Пост уже в identity map, перечитываем его вместе с актуальным счетчиком
+    stmt = queries.post_select(id).execution_options(populate_existing=True)
+    return queries.post_out(*(await db.execute(stmt)).one())
+
+
+@post_router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_article(post_id: int, db: AsyncSession = Depends(get_async_db)):
+    post = await db.get(Post, post_id)
+
+    if not post:
+        raise HTTPException(status_code=404, detail="Пост не найден")
+
+    category, created_at = post.category, post.created_at
+    await db.delete(post)
+    await bump_async(db, list_tag(None), list_tag(category), post_tag(post_id), comments_tag(post_id))
+    await db.commit()
+
+    cache.invalidate(post_tag(post_id), comments_tag(post_id))
+    live.publish_reset([post_id])
+    catalog.removed(category, created_at)
+    return
+
+
+@post_router.get("/{id}/comments", response_model=list[CommentOut])
+async def get_comments(
+    id: int,
+    request: Request,
+    limit: None | int = Query(None, ge=1, le=COMMENTS_PAGE_MAX),
+    cursor: None | str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    key = ("comments", id, limit, cursor)
+
+    async def build():
+        if not await db.get(Post, id):
+            raise HTTPException(status_code=404, detail="Статья не найдена")
+
+        rows = (await db.execute(queries.comments_select(id, limit, cursor))).all()
+        result, next_cursor = queries.comments_page(rows, limit)
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return CachedResponse.from_data(result, headers), [comments_tag(id)]
+
+    last_id = (await db.execute(queries.last_comment_id_select(id))).scalar()
+    etag = make_etag(key, await version_async(db, comments_tag(id)), last_id)
+    return await conditional_async(request, key, etag, build)
+
+
+@post_router.get("/{id}/comments/live")
+async def live_comments(id: int, request: Request):
+    async with async_read_session() as db:
+        if await db.get(Post, id) is None:
+            raise HTTPException(status_code=404, detail="Статья не найдена")
+
+    return live.stream_response(id, request.headers.get("Last-Event-ID"))
+
+
+@post_router.get("/{id}/detail", response_model=PostDetail)
+async def get_article_detail(
+    id: int,
+    request: Request,
+    comments_limit: int = Query(DETAIL_COMMENTS, ge=1, le=COMMENTS_PAGE_MAX),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Пост, автор и первая страница комментариев: два запроса вместо двух HTTP-запросов
+    key = ("detail", id, comments_limit)
+
+    async def build():
+        row = (await db.execute(queries.post_select(id))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Статья не найдена")
+        if row[1] is None:
+            raise HTTPException(status_code=404, detail="Автор не найден")
+
+        comment_rows = (await db.execute(queries.comments_select(id, comments_limit))).all()
+        detail = queries.post_detail(row, comment_rows, comments_limit)
+        return CachedResponse.from_data(detail), [post_tag(id), comments_tag(id)]
+
+    last_id = (await db.execute(queries.last_comment_id_select(id))).scalar()
+    stamp = (await version_async(db, post_tag(id)), await version_async(db, comments_tag(id)), last_id)
+    response = await conditional_async(request, key, make_etag(key, *stamp), build)
+    view_counter.hit(id)
+    return response
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from database.database import get_db
+from database.database import get_db, get_read_db
 from database.models import User
 from crud.schemas import UserCreate, UserLogin, Token
 from datetime import datetime
+from profiling import ProfiledRoute
 from auth import (
     authenticate_user, 
     create_access_token, 
@@ -14,22 +16,17 @@ from auth import (
     get_current_user
 )
 
-router = APIRouter(prefix="/api", tags=["authentication"])
+router = APIRouter(prefix="/api", tags=["authentication"], route_class=ProfiledRoute)
 
-@router.post("/register", response_model=Token)
-async def register(
-    user_data: UserCreate, 
-    response: Response, 
-    db: Session = Depends(get_db)
-):
-    # Проверяем, что пользователь не существует
-    existing_user = get_user_by_username(db, user_data.username)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
+
+def username_taken():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Username already registered"
+    )
+
+
+def validate_new_user(user_data: UserCreate):
     if len(user_data.password) < 4:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -41,10 +38,10 @@ async def register(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username must be between 3 and 150 characters"
         )
-    
-    # Создаем нового пользователя
-    hashed_password = get_password_hash(user_data.password)
-    new_user = User(
+
+
+def build_user(user_data: UserCreate, hashed_password: str):
+    return User(
         username=user_data.username,
         email=user_data.email,
         password=hashed_password,
@@ -55,19 +52,17 @@ async def register(
         is_active=True,
         date_joined=datetime.now()
     )
-    
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    
-    access_token = create_access_token(new_user.id, new_user.username)
-    refresh_token = create_refresh_token(new_user.id, new_user.username)
+
+
+def issue_tokens(response: Response, user_id: int, username: str, access_httponly: bool = False):
+    access_token = create_access_token(user_id, username)
+    refresh_token = create_refresh_token(user_id, username)
     
     # Устанавливаем куки
     response.set_cookie(
         key="access_token",
         value=access_token,
-        httponly=True, # logout на react
+        httponly=access_httponly,
         max_age=15*60,
         samesite="lax"
     )
@@ -84,62 +79,84 @@ async def register(
         "refresh": refresh_token
     }
 
+
+def refresh_claims(request: Request):
+    refresh_token = request.cookies.get("refresh_token")
+    
+    if not refresh_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token required"
+        )
+    
+    payload = verify_refresh_token(refresh_token)
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    return payload
+
+
+def user_info(user: User):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email
+    }
+
+@router.post("/register", response_model=Token)
+async def register(
+    user_data: UserCreate, 
+    response: Response, 
+    db: Session = Depends(get_db)
+):
+    # Проверяем, что пользователь не существует
+    existing_user = get_user_by_username(db, user_data.username)
+    if existing_user:
+        raise username_taken()
+    
+    validate_new_user(user_data)
+    # Соединение писателя не держим, пока считается хеш
+    db.rollback()
+    
+    # Создаем нового пользователя
+    hashed_password = await get_password_hash(user_data.password)
+    new_user = build_user(user_data, hashed_password)
+    
+    db.add(new_user)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Пока считался хеш, то же имя успел занять параллельный запрос
+        db.rollback()
+        raise username_taken()
+    db.refresh(new_user)
+    
+    return issue_tokens(response, new_user.id, new_user.username, access_httponly=True) # logout на react
+
 @router.post("/login", response_model=Token)
 async def login(
     user_data: UserLogin, 
     response: Response, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    user = authenticate_user(db, user_data.username, user_data.password)
+    user = await authenticate_user(db, user_data.username, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password"
         )
     
-    access_token = create_access_token(user.id, user.username)
-    refresh_token = create_refresh_token(user.id, user.username)
-    
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=False,
-        max_age=15*60,
-        samesite="lax"
-    )
-    response.set_cookie(
-        key="refresh_token",
-        value=refresh_token,
-        httponly=False, 
-        max_age=7*24*60*60,
-        samesite="lax"
-    )
-    
-    return {
-        "access": access_token,
-        "refresh": refresh_token
-    }
+    return issue_tokens(response, user.id, user.username)
 
 @router.post("/token/refresh", response_model=Token)
 async def refresh_token(
     request: Request,
     response: Response, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    refresh_token = request.cookies.get("refresh_token")
-    
-    if not refresh_token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Refresh token required"
-        )
-    
-    payload = verify_refresh_token(refresh_token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired refresh token"
-        )
+    payload = refresh_claims(request)
     
     user_id = payload.get("user_id")
     username = payload.get("username")
@@ -151,28 +168,7 @@ async def refresh_token(
             detail="User not found"
         )
     
-    new_access_token = create_access_token(user_id, username)
-    new_refresh_token = create_refresh_token(user_id, username)
-
-    response.set_cookie(
-        key="access_token",
-        value=new_access_token,
-        httponly=False,
-        max_age=15*60,
-        samesite="lax"
-    )
-    response.set_cookie(
-        key="refresh_token",
-        value=new_refresh_token,
-        httponly=False,
-        max_age=7*24*60*60,
-        samesite="lax"
-    )
-    
-    return {
-        "access": new_access_token,
-        "refresh": new_refresh_token
-    }
+    return issue_tokens(response, user_id, username)
 
 @router.post("/logout")
 async def logout(response: Response):
@@ -183,8 +179,4 @@ async def logout(response: Response):
 
 @router.get("/me")
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
-    return {
-        "id": current_user.id,
-        "username": current_user.username,
-        "email": current_user.email
-    }
\ No newline at end of file
+    return user_info(current_user)
\ No newline at end of file
@@ -0,0 +1,319 @@
+import datetime
+from collections import Counter
+from fastapi import HTTPException
+from sqlalchemy import select, insert, update, delete, bindparam
+from sqlalchemy.orm import Session
+from database.models import Post, User, Comment
+from settings import BATCH_MAX, EXCERPT_LENGTH
+from cache import cache, post_tag, comments_tag, list_tag
+from catalog import catalog
+import live
+from etags import bump
+from .schemas import PostCreate, PostBatchUpdate, CommentCreate, CommentBatchUpdate, BatchItemResult, CategoryEnum
+from . import queries
+
+# Пакетные операции: одна транзакция и один многострочный запрос на пакет.
+# Функции синхронные; асинхронные роутеры вызывают их через AsyncSession.run_sync
+
+CATEGORIES = {category.value for category in CategoryEnum}
+
+
+def check_size(items):
+    if not items:
+        raise HTTPException(status_code=400, detail="Пустой пакет")
+    if len(items) > BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Не больше {BATCH_MAX} элементов в пакете")
+
+
+def parse_ids(ids: str):
+    try:
+        parsed = [int(id) for id in ids.split(",") if id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids: ожидаются числа через запятую")
+
+    check_size(parsed)
+    return parsed
+
+
+def _results(size: int):
+    return [BatchItemResult(index=index) for index in range(size)]
+
+
+def get_posts(db: Session, ids: list[int]):
+    rows = db.execute(queries.posts_select().where(Post.id.in_(ids))).all()
+    found = {row[0].id: row for row in rows}
+    # Порядок как в запросе; отсутствующие id пропускаются
+    return [queries.post_out(*found[id]) for id in dict.fromkeys(ids) if id in found]
+
+
+def create_posts(db: Session, items: list[PostCreate]):
+    check_size(items)
+    results = _results(len(items))
+    authors = set(db.scalars(select(User.id).where(User.id.in_({item.author_id for item in items}))))
+
+    now = datetime.datetime.now()
+    rows, indexes = [], []
+    for index, item in enumerate(items):
+        if not item.title or not item.content:
+            results[index].error = "Нужны заголовок и текст"
+        elif item.author_id not in authors:
+            results[index].error = "Автор не найден"
+        elif item.category not in CATEGORIES:
+            results[index].error = "Неизвестная категория"
+        else:
+            rows.append({
+                "title": item.title,
+                "content": item.content,
+                "excerpt": item.content[:EXCERPT_LENGTH],
+                "category": item.category,
+                "author_id": item.author_id,
+                "created_at": now,
+                "comments_count": 0,
+            })
+            indexes.append(index)
+
+    if rows:
+        # SQLite выдает id по порядку строк в VALUES; sort_by_parameter_order
+        # перевел бы SQLAlchemy на вставку по одной строке
+        ids = sorted(db.scalars(insert(Post).returning(Post.id), rows))
+        for index, id in zip(indexes, ids):
+            results[index].id = id
+
+        categories = {row["category"] for row in rows}
+        bump(db, list_tag(None), *(list_tag(category) for category in categories))
+        db.commit()
+
+        cache.invalidate(list_tag(None, head=True), *(list_tag(category, head=True) for category in categories))
+        for row in rows:
+            catalog.added(row["category"], now)
+
+    return results
+
+
+def update_posts(db: Session, items: list[PostBatchUpdate]):
+    check_size(items)
+    results = _results(len(items))
+    current = {
+        id: (category, created_at) for id, category, created_at
+        in db.execute(select(Post.id, Post.category, Post.created_at).where(Post.id.in_({item.id for item in items})))
+    }
+
+    rows, moves = [], []
+    for index, item in enumerate(items):
+        results[index].id = item.id
+        if item.id not in current:
+            results[index].error = "Статья не найдена"
+            continue
+        if item.category is not None and item.category not in CATEGORIES:
+            results[index].error = "Неизвестная категория"
+            continue
+
+        row = {"id": item.id}
+        if item.title is not None:
+            row["title"] = item.title
+        if item.content is not None:
+            row["content"] = item.content
+            row["excerpt"] = item.content[:EXCERPT_LENGTH]
+        if item.category is not None:
+            row["category"] = item.category
+            old_category, created_at = current[item.id]
+            if item.category != old_category:
+                moves.append((old_category, item.category, created_at))
+        rows.append(row)
+
+    if rows:
+        # ORM bulk UPDATE по первичному ключу: executemany одного подготовленного запроса
+        db.execute(update(Post), rows)
+        post_tags = {post_tag(row["id"]) for row in rows}
+        bump(db, *post_tags, *{list_tag(category) for old, new, _ in moves for category in (old, new)})
+        db.commit()
+
+        cache.invalidate(*post_tags)
+        if moves:
+            cache.invalidate(*{list_tag(new) for _, new, _ in moves})
+            for old, new, created_at in moves:
+                catalog.moved(old, new, created_at)
+
+    return results
+
+
+def delete_posts(db: Session, ids: list[int]):
+    check_size(ids)
+    existing = {
+        id: (category, created_at) for id, category, created_at
+        in db.execute(select(Post.id, Post.category, Post.created_at).where(Post.id.in_(ids)))
+    }
+    results = [
+        BatchItemResult(index=index, id=id, error=None if id in existing else "Статья не найдена")
+        for index, id in enumerate(ids)
+    ]
+
+    if existing:
+        db.execute(delete(Post).where(Post.id.in_(existing)))
+        tags = [tag for id in existing for tag in (post_tag(id), comments_tag(id))]
+        bump(db, list_tag(None), *{list_tag(category) for category, _ in existing.values()}, *tags)
+        db.commit()
+
+        cache.invalidate(*tags)
+        for category, created_at in existing.values():
+            catalog.removed(category, created_at)
+
+    return results
+
+
+# Core-запрос по таблице: executemany с разными дельтами для каждого поста
+_posts = Post.__table__
+_change_counts = (
+    update(_posts)
+    .where(_posts.c.id == bindparam("b_post_id"))
+    .values(comments_count=_posts.c.comments_count + bindparam("b_delta"))
+)
+
+
+def _apply_count_deltas(db: Session, deltas: Counter):
+    # Счетчики меняются в той же транзакции, что и сами комментарии
+    db.execute(_change_counts, [{"b_post_id": id, "b_delta": delta} for id, delta in deltas.items()])
+
+
+def _comment_write_tags(post_ids):
+    # Счетчик комментариев в списках меняет версию поста, а не состав списков
+    return {tag for id in post_ids for tag in (post_tag(id), comments_tag(id))}
+
+
+def create_comments(db: Session, items: list[CommentCreate]):
+    check_size(items)
+    results = _results(len(items))
+    posts = set(db.scalars(select(Post.id).where(Post.id.in_({item.post_id for item in items}))))
+
+    now = datetime.datetime.now()
+    rows, indexes = [], []
+    for index, item in enumerate(items):
+        if not item.text:
+            results[index].error = "Пустой комментарий"
+        elif item.post_id not in posts:
+            results[index].error = "Статья не найдена"
+        else:
+            rows.append({"text": item.text, "author_id": item.author_id, "post_id": item.post_id, "created_at": now})
+            indexes.append(index)
+
+    if rows:
+        ids = sorted(db.scalars(insert(Comment).returning(Comment.id), rows))
+        for index, id in zip(indexes, ids):
+            results[index].id = id
+
+        deltas = Counter(row["post_id"] for row in rows)
+        _apply_count_deltas(db, deltas)
+        tags = _comment_write_tags(deltas)
+        bump(db, *tags)
+        db.commit()
+
+        cache.invalidate(*tags)
+        live.publish_reset(deltas)
+
+    return results
+
+
+def update_comments(db: Session, items: list[CommentBatchUpdate]):
+    check_size(items)
+    results = _results(len(items))
+    posts = dict(db.execute(select(Comment.id, Comment.post_id).where(Comment.id.in_({item.id for item in items}))).all())
+
+    rows = []
+    for index, item in enumerate(items):
+        results[index].id = item.id
+        if item.id not in posts:
+            results[index].error = "Комментарий не найден"
+        else:
+            rows.append({"id": item.id, "text": item.text})
+
+    if rows:
+        db.execute(update(Comment), rows)
+        tags = {comments_tag(posts[row["id"]]) for row in rows}
+        bump(db, *tags)
+        db.commit()
+
+        cache.invalidate(*tags)
+        live.publish_reset({posts[row["id"]] for row in rows})
+
+    return results
+
+
+def delete_comments(db: Session, ids: list[int]):
+    check_size(ids)
+    posts = dict(db.execute(select(Comment.id, Comment.post_id).where(Comment.id.in_(ids))).all())
+    results = [
+        BatchItemResult(index=index, id=id, error=None if id in posts else "Комментарий не найден")
+        for index, id in enumerate(ids)
+    ]
+
+    if posts:
+        db.execute(delete(Comment).where(Comment.id.in_(posts)))
+        deltas = Counter()
+        for post_id in posts.values():
+            deltas[post_id] -= 1
+        _apply_count_deltas(db, deltas)
+        tags = _comment_write_tags(deltas)
+        bump(db, *tags)
+        db.commit()
+
+        cache.invalidate(*tags)
+        for id, post_id in posts.items():
+            live.publish_deleted(post_id, id)
+
+    return results
+
+
+def write_comment_group(db: Session, creates: list[CommentCreate], edits: list[tuple[int, None | str]]):
+    # Одна транзакция на группу одиночных записей от comment_writer. Для каждой
+    # записи возвращается id (для вставки), None (для правки) или HTTPException.
+    # После commit здесь больше ничего не делается: сбой дальше не должен приводить
+    # к повтору уже записанной группы. Теги кэша, новые строки и id правок
+    # возвращаются для invalidate и publish_comment_group
+    created = [None] * len(creates)
+    edited = [None] * len(edits)
+    tags = set()
+
+    posts = set(db.scalars(select(Post.id).where(Post.id.in_({item.post_id for item in creates})))) if creates else set()
+    now = datetime.datetime.now()
+    rows, indexes = [], []
+    for index, item in enumerate(creates):
+        if item.post_id not in posts:
+            created[index] = HTTPException(status_code=404, detail="Post not found")
+        else:
+            rows.append({"text": item.text, "author_id": item.author_id, "post_id": item.post_id, "created_at": now})
+            indexes.append(index)
+
+    if rows:
+        ids = sorted(db.scalars(insert(Comment).returning(Comment.id), rows))
+        for index, id, row in zip(indexes, ids, rows):
+            created[index] = id
+            row["id"] = id
+
+        deltas = Counter(row["post_id"] for row in rows)
+        _apply_count_deltas(db, deltas)
+        tags |= _comment_write_tags(deltas)
+
+    existing = dict(db.execute(select(Comment.id, Comment.post_id).where(Comment.id.in_({id for id, _ in edits}))).all()) if edits else {}
+    edit_rows = []
+    for index, (id, text) in enumerate(edits):
+        if id not in existing:
+            edited[index] = HTTPException(status_code=404, detail="Comment not found")
+        elif text is not None:
+            edit_rows.append({"id": id, "text": text})
+
+    if edit_rows:
+        db.execute(update(Comment), edit_rows)
+        tags |= {comments_tag(existing[row["id"]]) for row in edit_rows}
+
+    if tags:
+        bump(db, *tags)
+        db.commit()
+
+    return created, edited, (tags, rows, [row["id"] for row in edit_rows])
+
+
+def publish_comment_group(db: Session, rows: list[dict], edit_ids: list[int]):
+    live.publish_comments(db, "created", [Comment(**row) for row in rows])
+    if edit_ids and live.broker.active:
+        changed = db.scalars(select(Comment).where(Comment.id.in_(edit_ids))).all()
+        live.publish_comments(db, "updated", changed)
@@ -1,20 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from database.models import Comment, Post
 from database.database import get_db
 from sqlalchemy.orm import Session
-from .schemas import CommentCreate, CommentUpdate
+from .schemas import CommentCreate, CommentUpdate, CommentBatchUpdate, BatchItemResult
+from . import batch, export
+from settings import COMMENTS_PAGE_MAX, COMMENT_WRITER
+from cache import cache, post_tag, comments_tag
+from etags import bump
+import live
+from comment_writer import writer
 import datetime
+from profiling import ProfiledRoute
 
 
-comment_router = APIRouter()
+comment_router = APIRouter(route_class=ProfiledRoute)
 
 
 @comment_router.get("/")
-def get_comments(db: Session = Depends(get_db)):
-    comments = db.query(Comment).all()
+def get_comments(
+    response: Response,
+    limit: int = Query(COMMENTS_PAGE_MAX, ge=1, le=COMMENTS_PAGE_MAX),
+    cursor: None | int = Query(None, ge=0),
+    db: Session = Depends(get_db)
+):
+    # Полная выгрузка - через /comments/export; здесь страницы по id,
+    # курсор - id последнего полученного комментария
+    comments = db.query(Comment).filter(Comment.id > (cursor or 0)).order_by(Comment.id).limit(limit + 1).all()
+    if len(comments) > limit:
+        comments = comments[:limit]
+        response.headers["X-Next-Cursor"] = str(comments[-1].id)
     return comments
 
 
+@comment_router.get("/export")
+def export_comments(post_id: None | int = None):
+    return export.ndjson_response(export.comments_export_select(post_id))
+
+
+@comment_router.post("/batch", response_model=list[BatchItemResult], status_code=status.HTTP_201_CREATED)
+def create_comments_batch(items: list[CommentCreate], db: Session = Depends(get_db)):
+    # Импорт пачкой: одна вставка и один пересчет счетчиков на весь пакет
+    return batch.create_comments(db, items)
+
+
+@comment_router.put("/batch", response_model=list[BatchItemResult])
+def update_comments_batch(items: list[CommentBatchUpdate], db: Session = Depends(get_db)):
+    return batch.update_comments(db, items)
+
+
+@comment_router.delete("/batch", response_model=list[BatchItemResult])
+def delete_comments_batch(ids: list[int], db: Session = Depends(get_db)):
+    return batch.delete_comments(db, ids)
+
+
 @comment_router.get("/{id}")
 def get_comment(id: int, db: Session = Depends(get_db)):
     return db.query(Comment).filter(Comment.id==id).first()
@@ -27,26 +65,46 @@ def comment_delete(id: int, db: Session = Depends(get_db)):
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
+    db.query(Post).filter(Post.id == comment.post_id).update(
+        {Post.comments_count: Post.comments_count - 1}
+    )
     db.delete(comment)
+    bump(db, post_tag(comment.post_id), comments_tag(comment.post_id))
     db.commit()
+
+    cache.invalidate(post_tag(comment.post_id), comments_tag(comment.post_id))
+    live.publish_deleted(comment.post_id, id)
     return
 
 
 @comment_router.put("/{id}")
 def comment_update(id: int, data: CommentUpdate, db: Session = Depends(get_db)):
+    if COMMENT_WRITER == "group":
+        # Правка уходит в общую транзакцию писателя; ответ - после ее commit
+        writer.update(id, data.text).result()
+        return
+
     comment = db.query(Comment).filter(Comment.id==id).first()
+    if not comment:
+        raise HTTPException(status_code=404, detail="Comment not found")
 
     if data.text is not None:
         comment.text = data.text
 
+    bump(db, comments_tag(comment.post_id))
     db.commit()
     db.refresh(comment)
 
+    cache.invalidate(comments_tag(comment.post_id))
+    live.publish_comment(db, "updated", comment)
     return
 
 
 @comment_router.post("/")
 def create_comments(comment_data: CommentCreate, db: Session = Depends(get_db)):
+    if COMMENT_WRITER == "group":
+        return {"id": writer.create(comment_data).result()}
+
     post = db.query(Post).filter(Post.id == comment_data.post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -58,7 +116,14 @@ def create_comments(comment_data: CommentCreate, db: Session = Depends(get_db)):
         created_at=datetime.datetime.now()
     )
 
+    # Счетчик обновляется в той же транзакции, что и вставка
+    post.comments_count = Post.comments_count + 1
     db.add(new_comment)
+    bump(db, post_tag(post.id), comments_tag(post.id))
     db.commit()
     db.refresh(new_comment)
-    return
\ No newline at end of file
+
+    # Число комментариев показывается и в самом посте, и в списках
+    cache.invalidate(post_tag(new_comment.post_id), comments_tag(new_comment.post_id))
+    live.publish_comment(db, "created", new_comment)
+    return {"id": new_comment.id}
\ No newline at end of file
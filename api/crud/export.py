@@ -0,0 +1,72 @@
+import json
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from database.database import read_session, async_read_session
+from database.models import Post, User, Comment
+from settings import EXPORT_CHUNK
+
+# Потоковая выгрузка в NDJSON: одна строка на запись, память ограничена размером пачки.
+# Сессия открывается внутри генератора и живет ровно столько, сколько идет выгрузка
+
+NDJSON = "application/x-ndjson"
+
+
+def posts_export_select(category: None | str = None):
+    # Только колонки, без ORM-объектов и identity map
+    stmt = (
+        select(
+            Post.id, Post.title, Post.content, Post.category, Post.author_id,
+            User.username.label("author_name"), Post.created_at, Post.comments_count
+        )
+        .outerjoin(User, User.id == Post.author_id)
+        .order_by(Post.id)
+    )
+    if category:
+        stmt = stmt.where(Post.category == category)
+    return stmt
+
+
+def comments_export_select(post_id: None | int = None):
+    stmt = (
+        select(Comment.id, Comment.post_id, Comment.author_id, Comment.text, Comment.created_at)
+        .order_by(Comment.id)
+    )
+    if post_id is not None:
+        stmt = stmt.where(Comment.post_id == post_id)
+    return stmt
+
+
+def _line(row):
+    item = row._asdict()
+    if item["created_at"] is not None:
+        item["created_at"] = item["created_at"].isoformat()
+    if "author_name" in item and not item["author_name"]:
+        item["author_name"] = "Unknown"
+    return json.dumps(item, ensure_ascii=False).encode() + b"\n"
+
+
+def _chunk(rows):
+    return b"".join(_line(row) for row in rows)
+
+
+def _stream(stmt):
+    # Синхронный генератор Starlette прокручивает в пуле потоков
+    with read_session() as db:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_CHUNK))
+        for rows in result.partitions():
+            yield _chunk(rows)
+
+
+async def _stream_async(stmt):
+    async with async_read_session() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_CHUNK))
+        async for rows in result.partitions():
+            yield _chunk(rows)
+
+
+def ndjson_response(stmt):
+    return StreamingResponse(_stream(stmt), media_type=NDJSON)
+
+
+def ndjson_response_async(stmt):
+    return StreamingResponse(_stream_async(stmt), media_type=NDJSON)
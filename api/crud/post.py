@@ -1,67 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
-from .schemas import PostCreate, PostUpdate, PostOut, CategoryEnum, CommentOut
+from .schemas import PostCreate, PostUpdate, PostOut, PostSummary, PostDetail, CategoryEnum, CommentOut
+from .schemas import PostBatchUpdate, BatchItemResult, PopularPost
+from . import queries, batch, export
 import datetime
-from database.database import get_db
-from database.models import Post, User, Comment
+from database.database import get_db, read_session
+from database.models import Post, User
+from settings import ARTICLES_PAGE_MAX, ARTICLES_PAGE_SIZE, EXCERPT_LENGTH, SEARCH_PAGE_MAX, COMMENTS_PAGE_MAX, DETAIL_COMMENTS, POPULAR_TOP_K
+from cache import cache, CachedResponse, post_tag, comments_tag, list_tag
+from catalog import catalog
+from view_counter import view_counter
+import live
+from fastjson import json_response
+from etags import bump, version, make_etag, conditional
+from profiling import ProfiledRoute
 
 
-post_router = APIRouter()
+post_router = APIRouter(route_class=ProfiledRoute)
+
+
+@post_router.get("/search", response_model=list[PostSummary])
+def search_articles(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    in_comments: bool = False,
+    db: Session = Depends(get_db)
+):
+    # Маршрут объявлен раньше /{id}, иначе "search" уйдет в валидацию id
+    if not q.split():
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+
+    rows = db.execute(queries.search_select(q, limit, offset, in_comments)).all()
+    items, headers = queries.search_page(rows, limit, offset)
+    return json_response(items, headers)
+
+
+@post_router.get("/export")
+def export_articles(category: None | str = None):
+    # Все посты одним потоком NDJSON, без сборки списка в памяти
+    return export.ndjson_response(export.posts_export_select(category))
+
+
+@post_router.get("/popular", response_model=list[PopularPost])
+def get_popular_articles(limit: int = Query(10, ge=1, le=POPULAR_TOP_K), db: Session = Depends(get_db)):
+    # Рейтинг уже посчитан счетчиком просмотров: здесь только посты по первичному ключу
+    return json_response(view_counter.popular(db, limit))
+
+
+@post_router.get("/batch", response_model=list[PostOut])
+def get_articles_batch(ids: str = Query(..., min_length=1), db: Session = Depends(get_db)):
+    # Один IN-запрос вместо N запросов к /{id}
+    return batch.get_posts(db, batch.parse_ids(ids))
+
+
+@post_router.post("/batch", response_model=list[BatchItemResult], status_code=status.HTTP_201_CREATED)
+def create_articles_batch(items: list[PostCreate], db: Session = Depends(get_db)):
+    return batch.create_posts(db, items)
+
+
+@post_router.put("/batch", response_model=list[BatchItemResult])
+def update_articles_batch(items: list[PostBatchUpdate], db: Session = Depends(get_db)):
+    return batch.update_posts(db, items)
+
+
+@post_router.delete("/batch", response_model=list[BatchItemResult])
+def delete_articles_batch(ids: list[int], db: Session = Depends(get_db)):
+    return batch.delete_posts(db, ids)
 
 
 @post_router.get("/{id}", response_model=PostOut)
-def get_article(id: int, db: Session = Depends(get_db)):
-    post = db.query(Post).filter(Post.id == id).first()
+def get_article(id: int, request: Request, db: Session = Depends(get_db)):
+    key = ("article", id)
 
-    if not post:
-        raise HTTPException(status_code=404, detail="Статья не найдена")
-    
-    author = db.query(User).filter(User.id == post.author_id).first()
-    if not author:
-        raise HTTPException(status_code=404, detail="Автор не найден")
-
-    comments_count = db.query(Comment).filter(Comment.post_id == id).count()
-    
-    return PostOut(
-        id=post.id,
-        title=post.title,
-        content=post.content,
-        category=post.category,
-        author_id=post.author_id,
-        author_name=author.username,
-        created_at=post.created_at.isoformat() if post.created_at else "",
-        comments_count=comments_count
-    )
+    def build():
+        row = db.execute(queries.post_select(id)).first()
+
+        if not row:
+            raise HTTPException(status_code=404, detail="Статья не найдена")
+
+        post, author_name = row
+        if author_name is None:
+            raise HTTPException(status_code=404, detail="Автор не найден")
+
+        return CachedResponse.from_data(queries.post_out(post, author_name)), [post_tag(id)]
+
+    response = conditional(request, key, make_etag(key, version(db, post_tag(id))), build)
+    # Просмотр считается в памяти, в базу уходит пачкой
+    view_counter.hit(id)
+    return response
 
 
-@post_router.get("/", response_model=list[PostOut])
-@post_router.get("/category/{category}", response_model=list[PostOut])
-def get_articles(category: None | str = None, db: Session = Depends(get_db)):
-    query = db.query(Post)
-    
-    if category:
-        query = query.filter(Post.category == category)
-    
-    posts = query.order_by(Post.created_at.desc()).all()
-    
-    result_list = []
-    for post in posts:
-        author = db.query(User).filter(User.id == post.author_id).first()
-        
-        comments_count = db.query(Comment).filter(Comment.post_id == post.id).count()
-        
-        result_list.append(PostOut(
-            id=post.id,
-            title=post.title,
-            content=post.content,
-            category=post.category,
-            author_id=post.author_id,
-            author_name=author.username if author else "Unknown",
-            created_at=post.created_at.isoformat() if post.created_at else "",
-            comments_count=comments_count
-        ))
-    
-    return result_list
+@post_router.get("/", response_model=list[PostOut] | list[PostSummary])
+@post_router.get("/category/{category}", response_model=list[PostOut] | list[PostSummary])
+def get_articles(
+    request: Request,
+    category: None | str = None,
+    limit: int = Query(ARTICLES_PAGE_SIZE, ge=1, le=ARTICLES_PAGE_MAX),
+    cursor: None | str = None,
+    summary: bool = False,
+    db: Session = Depends(get_db)
+):
+    key = ("articles", category, limit, cursor, summary)
+
+    def build():
+        rows = db.execute(queries.articles_select(category, limit, cursor, summary)).all()
+        return queries.articles_page(rows, category, limit, cursor, summary)
+
+    stamp = db.execute(queries.list_stamp_select(category, limit, cursor)).one()
+    return conditional(request, key, make_etag(key, *stamp), build)
 
 
 @post_router.post("/", response_model=PostOut, status_code=status.HTTP_201_CREATED)
@@ -74,28 +121,24 @@ def create_articles(post_data: PostCreate, db: Session = Depends(get_db)):
     if not post_data.category in [category.value for category in CategoryEnum]:
         raise HTTPException(status_code=404)
 
+    created_at = datetime.datetime.now()
     new_post = Post(
         title = post_data.title,
         content = post_data.content,
         category = post_data.category,
         author_id = post_data.author_id,
-        created_at = datetime.datetime.now()
+        excerpt = post_data.content[:EXCERPT_LENGTH],
+        created_at = created_at
     )
 
     db.add(new_post)
+    bump(db, list_tag(None), list_tag(post_data.category))
     db.commit()
-    db.refresh(new_post)
-
-    return PostOut(
-        id = new_post.id,
-        title = new_post.title,
-        content = new_post.content,
-        category = new_post.category,
-        author_id = new_post.author_id,
-        author_name = author.username,
-        created_at = new_post.created_at.isoformat() if new_post.created_at else "",
-        comments_count = 0
-    )
+
+    cache.invalidate(list_tag(None, head=True), list_tag(post_data.category, head=True))
+    catalog.added(post_data.category, created_at)
+
+    return queries.post_out(*db.execute(queries.post_select(new_post.id)).one())
 
 
 @post_router.put("/{id}", response_model=PostOut)
@@ -108,25 +151,23 @@ def update_article(id: int, data: PostUpdate, db: Session = Depends(get_db)):
         post.title = data.title
     if data.content is not None:
         post.content = data.content
+        post.excerpt = data.content[:EXCERPT_LENGTH]
+    old_category, created_at = post.category, post.created_at
+    category_changed = data.category is not None and data.category != post.category
     if data.category is not None:
         post.category = data.category
 
+    # Состав списков меняется только при переносе в другую категорию
+    bump(db, post_tag(id), *([list_tag(old_category), list_tag(data.category)] if category_changed else []))
     db.commit()
-    db.refresh(post)
-
-    author = db.query(User).filter(User.id == post.author_id).first()
-    comments_count = db.query(Comment).filter(Comment.post_id == post.id).count()
-
-    return PostOut(
-        id=post.id,
-        title=post.title,
-        content=post.content,
-        category=post.category,
-        author_id=post.author_id,
-        author_name=author.username if author else "Unknown",
-        created_at=post.created_at.isoformat() if post.created_at else "",
-        comments_count=comments_count
-    )
+
+    cache.invalidate(post_tag(id))
+    if category_changed:
+        # Пост мог попасть на любую страницу списков новой категории
+        cache.invalidate(list_tag(data.category))
+        catalog.moved(old_category, data.category, created_at)
+
+    return queries.post_out(*db.execute(queries.post_select(post.id)).one())
 
 
 @post_router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -135,29 +176,77 @@ def delete_article(post_id: int, db: Session = Depends(get_db)):
 
     if not post:
         raise HTTPException(status_code=404, detail="Пост не найден")
-    
+
+    category, created_at = post.category, post.created_at
     db.delete(post)
+    bump(db, list_tag(None), list_tag(category), post_tag(post_id), comments_tag(post_id))
     db.commit()
+
+    cache.invalidate(post_tag(post_id), comments_tag(post_id))
+    live.publish_reset([post_id])
+    catalog.removed(category, created_at)
     return
 
 
 @post_router.get("/{id}/comments", response_model=list[CommentOut])
-def get_comments(id: int, db: Session = Depends(get_db)):
-    post = db.query(Post).filter(Post.id == id).first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Статья не найдена")
-    
-    comments = db.query(Comment).filter(Comment.post_id == id).order_by(Comment.created_at.desc()).all()
-    
-    result = []
-    for comment in comments:
-        author = db.query(User).filter(User.id == comment.author_id).first()
-        
-        result.append(CommentOut(
-            id=comment.id,
-            text=comment.text,
-            author_name=author.username if author else "Unknown",
-            created_at=comment.created_at.isoformat() if comment.created_at else ""
-        ))
-    
-    return result
+def get_comments(
+    id: int,
+    request: Request,
+    limit: None | int = Query(None, ge=1, le=COMMENTS_PAGE_MAX),
+    cursor: None | str = None,
+    db: Session = Depends(get_db)
+):
+    key = ("comments", id, limit, cursor)
+
+    def build():
+        if not db.query(Post).filter(Post.id == id).first():
+            raise HTTPException(status_code=404, detail="Статья не найдена")
+
+        rows = db.execute(queries.comments_select(id, limit, cursor)).all()
+        result, next_cursor = queries.comments_page(rows, limit)
+
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return CachedResponse.from_data(result, headers), [comments_tag(id)]
+
+    last_id = db.execute(queries.last_comment_id_select(id)).scalar()
+    etag = make_etag(key, version(db, comments_tag(id)), last_id)
+    return conditional(request, key, etag, build)
+
+
+@post_router.get("/{id}/comments/live")
+def live_comments(id: int, request: Request):
+    # SSE: новые, измененные и удаленные комментарии поста. Сессия не берется через
+    # Depends, чтобы соединение из пула не держалось все время жизни потока
+    with read_session() as db:
+        if db.get(Post, id) is None:
+            raise HTTPException(status_code=404, detail="Статья не найдена")
+
+    return live.stream_response(id, request.headers.get("Last-Event-ID"))
+
+
+@post_router.get("/{id}/detail", response_model=PostDetail)
+def get_article_detail(
+    id: int,
+    request: Request,
+    comments_limit: int = Query(DETAIL_COMMENTS, ge=1, le=COMMENTS_PAGE_MAX),
+    db: Session = Depends(get_db)
+):
+    # Пост, автор и первая страница комментариев: два запроса вместо двух HTTP-запросов
+    key = ("detail", id, comments_limit)
+
+    def build():
+        row = db.execute(queries.post_select(id)).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Статья не найдена")
+        if row[1] is None:
+            raise HTTPException(status_code=404, detail="Автор не найден")
+
+        comment_rows = db.execute(queries.comments_select(id, comments_limit)).all()
+        detail = queries.post_detail(row, comment_rows, comments_limit)
+        return CachedResponse.from_data(detail), [post_tag(id), comments_tag(id)]
+
+    last_id = db.execute(queries.last_comment_id_select(id)).scalar()
+    stamp = (version(db, post_tag(id)), version(db, comments_tag(id)), last_id)
+    response = conditional(request, key, make_etag(key, *stamp), build)
+    view_counter.hit(id)
+    return response
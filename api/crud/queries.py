@@ -0,0 +1,245 @@
+from sqlalchemy import func, select, tuple_, table, column, literal, literal_column, text, cast, String
+from sqlalchemy.orm import defer
+from database.models import Post, User, Comment, WriteVersion
+from settings import EXCERPT_LENGTH, FAST_JSON
+from cache import CachedResponse, post_tag, list_tag
+from .schemas import PostOut, PostSummary, CommentOut, AuthorOut, PostDetail
+from .pagination import encode_cursor, decode_cursor
+
+# Запросы и преобразования, общие для синхронных и асинхронных роутеров
+
+
+def posts_select(summary: bool = False):
+    # Один запрос: пост и имя автора, число комментариев хранится в самом посте
+    columns = [Post, User.username]
+    if summary:
+        columns.append(func.coalesce(Post.excerpt, func.substr(Post.content, 1, EXCERPT_LENGTH)))
+
+    stmt = select(*columns).outerjoin(User, User.id == Post.author_id)
+    if summary:
+        stmt = stmt.options(defer(Post.content))
+    return stmt
+
+
+def post_columns_select(summary: bool = False):
+    # Быстрый путь для списков: только колонки, строки сразу превращаются в словари
+    if summary:
+        body = func.coalesce(Post.excerpt, func.substr(Post.content, 1, EXCERPT_LENGTH)).label("excerpt")
+    else:
+        body = Post.content
+
+    return select(
+        Post.id, Post.title, body, Post.category, Post.author_id,
+        User.username.label("author_name"), Post.created_at, Post.comments_count
+    ).outerjoin(User, User.id == Post.author_id)
+
+
+def list_select(summary: bool = False):
+    return post_columns_select(summary) if FAST_JSON else posts_select(summary)
+
+
+def post_select(id: int):
+    return posts_select().where(Post.id == id)
+
+
+def _articles_page(stmt, category: None | str, limit: None | int, cursor: None | str):
+    if category:
+        stmt = stmt.where(Post.category == category)
+
+    # Keyset-пагинация по (created_at, id): стоимость страницы не зависит от ее номера
+    if cursor:
+        stmt = stmt.where(tuple_(Post.created_at, Post.id) < decode_cursor(cursor))
+
+    stmt = stmt.order_by(Post.created_at.desc(), Post.id.desc())
+    if limit:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def articles_select(category: None | str, limit: int, cursor: None | str, summary: bool):
+    return _articles_page(list_select(summary), category, limit, cursor)
+
+
+def list_stamp_select(category: None | str, limit: int, cursor: None | str):
+    # Версия страницы списка одним запросом:
+    # - версия состава списка (list:<категория>), меняется при добавлении, удалении и переносе постов;
+    # - id самого нового поста списка: вставки в обход API (например, через Django);
+    # - сумма версий постов страницы: правка поста или его счетчика комментариев
+    #   меняет только страницы, на которых он есть
+    page = _articles_page(select(Post.id), category, limit, cursor).subquery()
+    post_version = WriteVersion.__table__.alias("post_version")
+    return select(
+        select(WriteVersion.version).where(WriteVersion.scope == list_tag(category)).scalar_subquery(),
+        _articles_page(select(Post.id), category, None, None).limit(1).scalar_subquery(),
+        select(func.coalesce(func.sum(post_version.c.version), 0))
+        .select_from(page)
+        .join(post_version, post_version.c.scope == literal("post:") + cast(page.c.id, String))
+        .scalar_subquery(),
+    )
+
+
+def articles_page(rows, category: None | str, limit: int, cursor: None | str, summary: bool):
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = _keyset_row(rows[-1])
+        headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+
+    items = list_items(rows, summary)
+
+    # Страница зависит только от постов, которые в нее попали
+    tags = [list_tag(category)] + [post_tag(_keyset_row(row).id) for row in rows]
+    if not cursor:
+        tags.append(list_tag(category, head=True))
+
+    return CachedResponse.from_data(items, headers), tags
+
+
+# FTS5-таблицы создаются миграцией и не описаны в моделях
+post_fts = table("main_post_fts", column("rowid"))
+comment_fts = table("main_comment_fts", column("rowid"))
+
+
+def fts_query(q: str):
+    # Каждое слово - отдельная фраза в кавычках: пользовательский ввод
+    # не должен ломаться о синтаксис FTS5 (AND, NEAR, *, двоеточия)
+    return " ".join('"' + word.replace('"', '""') + '"' for word in q.split())
+
+
+def search_select(q: str, limit: int, offset: int, in_comments: bool):
+    # bm25: чем меньше, тем релевантнее; совпадения в заголовке весят больше
+    matches = (
+        select(post_fts.c.rowid.label("post_id"), func.bm25(literal_column("main_post_fts"), 10.0, 1.0).label("rank"))
+        .where(text("main_post_fts MATCH :q"))
+    )
+    if in_comments:
+        comment_matches = (
+            select(Comment.post_id, func.bm25(literal_column("main_comment_fts")).label("rank"))
+            .join(comment_fts, comment_fts.c.rowid == Comment.id)
+            .where(text("main_comment_fts MATCH :q"))
+        )
+        union = matches.union_all(comment_matches).subquery()
+        matches = select(union.c.post_id, func.min(union.c.rank).label("rank")).group_by(union.c.post_id)
+
+    matches = matches.subquery()
+    return (
+        list_select(summary=True)
+        .join(matches, matches.c.post_id == Post.id)
+        .order_by(matches.c.rank, Post.id.desc())
+        .limit(limit + 1)
+        .offset(offset)
+        .params(q=fts_query(q))
+    )
+
+
+def search_page(rows, limit: int, offset: int):
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Offset"] = str(offset + limit)
+
+    return list_items(rows, summary=True), headers
+
+
+def comments_select(post_id: int, limit: None | int = None, cursor: None | str = None):
+    if FAST_JSON:
+        columns = [Comment.id, Comment.text, User.username.label("author_name"), Comment.created_at]
+    else:
+        columns = [Comment, User.username]
+
+    stmt = (
+        select(*columns)
+        .outerjoin(User, User.id == Comment.author_id)
+        .where(Comment.post_id == post_id)
+    )
+
+    if cursor:
+        stmt = stmt.where(tuple_(Comment.created_at, Comment.id) < decode_cursor(cursor))
+
+    stmt = stmt.order_by(Comment.created_at.desc(), Comment.id.desc())
+    if limit:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+def comments_page(rows, limit: None | int):
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = _keyset_row(rows[-1])
+        next_cursor = encode_cursor(last.created_at, last.id)
+
+    if FAST_JSON:
+        return [row_dict(row) for row in rows], next_cursor
+    return [comment_out(*row) for row in rows], next_cursor
+
+
+def post_detail(row, comment_rows, comments_limit: int):
+    post, author_name = row
+    comments, next_cursor = comments_page(comment_rows, comments_limit)
+    return PostDetail(
+        post=post_out(post, author_name),
+        author=AuthorOut(id=post.author_id, username=author_name),
+        comments=comments,
+        next_comments_cursor=next_cursor
+    )
+
+
+def last_comment_id_select(post_id: int):
+    return select(func.max(Comment.id)).where(Comment.post_id == post_id)
+
+
+def _keyset_row(row):
+    # В быстром пути строка сама несет id и created_at, иначе они в ORM-объекте
+    return row if FAST_JSON else row[0]
+
+
+def row_dict(row):
+    # Те же поля и значения по умолчанию, что и у PostOut/PostSummary/CommentOut
+    item = row._asdict()
+    item["author_name"] = item["author_name"] or "Unknown"
+    item["created_at"] = item["created_at"].isoformat() if item["created_at"] else ""
+    return item
+
+
+def list_items(rows, summary: bool):
+    if FAST_JSON:
+        return [row_dict(row) for row in rows]
+    if summary:
+        return [post_summary(*row) for row in rows]
+    return [post_out(*row) for row in rows]
+
+
+def post_out(post: Post, author_name: None | str):
+    return PostOut(
+        id=post.id,
+        title=post.title,
+        content=post.content,
+        category=post.category,
+        author_id=post.author_id,
+        author_name=author_name if author_name else "Unknown",
+        created_at=post.created_at.isoformat() if post.created_at else "",
+        comments_count=post.comments_count
+    )
+
+
+def post_summary(post: Post, author_name: None | str, excerpt: None | str):
+    return PostSummary(
+        id=post.id,
+        title=post.title,
+        excerpt=excerpt or "",
+        category=post.category,
+        author_id=post.author_id,
+        author_name=author_name if author_name else "Unknown",
+        created_at=post.created_at.isoformat() if post.created_at else "",
+        comments_count=post.comments_count
+    )
+
+
+def comment_out(comment: Comment, author_name: None | str):
+    return CommentOut(
+        id=comment.id,
+        text=comment.text,
+        author_name=author_name if author_name else "Unknown",
+        created_at=comment.created_at.isoformat() if comment.created_at else ""
+    )
@@ -0,0 +1,75 @@
+import datetime
+import sys
+from sqlalchemy import text
+from . import queries
+from .pagination import encode_cursor
+
+# Горячие запросы API; ни один не должен читать таблицу целиком
+TABLES = ("main_post", "main_comment", "auth_user")
+
+
+def hot_queries():
+    cursor = encode_cursor(datetime.datetime(2025, 1, 1), 1)
+    return {
+        "articles": queries.articles_select(None, 10, None, False),
+        "articles_page": queries.articles_select(None, 10, cursor, True),
+        "articles_category": queries.articles_select("technology", 10, None, False),
+        "articles_category_page": queries.articles_select("technology", 10, cursor, True),
+        "article": queries.post_select(1),
+        "search": queries.search_select("python", 20, 0, True),
+        "comments": queries.comments_select(1),
+        "comments_page": queries.comments_select(1, 20, cursor),
+        "last_comment_id": queries.last_comment_id_select(1),
+        "write_version": text("SELECT version FROM api_write_version WHERE scope = 'post:1'"),
+        "list_stamp": queries.list_stamp_select(None, 10, None),
+        "list_stamp_category_page": queries.list_stamp_select("technology", 10, cursor),
+    }
+
+
+def explain(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect)
+    values = compiled.construct_params()
+    params = []
+    for name in compiled.positiontup or ():
+        # Те же преобразования, что и при обычном выполнении (например, DateTime -> str)
+        processor = compiled.binds[name].type.bind_processor(conn.dialect)
+        value = values[name]
+        params.append(processor(value) if processor else value)
+
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, tuple(params)).fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    # "SCAN main_post" без "USING ... INDEX" означает чтение всей таблицы
+    return [
+        step for step in plan
+        if step.startswith("SCAN ") and step.split()[1] in TABLES and "USING" not in step
+    ]
+
+
+def check_query_plans(conn):
+    failures = {}
+    for name, stmt in hot_queries().items():
+        scans = full_scans(explain(conn, stmt))
+        if scans:
+            failures[name] = scans
+    return failures
+
+
+# python -m crud.query_plans
+if __name__ == "__main__":
+    from database.database import engine
+    from database.migrations import migrate
+
+    migrate(engine)
+    with engine.connect() as conn:
+        for name, stmt in hot_queries().items():
+            print(f"{name}:")
+            for step in explain(conn, stmt):
+                print(f"    {step}")
+
+        failures = check_query_plans(conn)
+
+    if failures:
+        sys.exit(f"Полный просмотр таблиц: {failures}")
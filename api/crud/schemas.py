@@ -20,6 +20,22 @@ class PostOut(BaseModel):
     created_at: str
     comments_count: int
 
+
+class PostSummary(BaseModel):
+    id: int
+    title: str
+    excerpt: str
+    category: str
+    author_id: int
+    author_name: str
+    created_at: str
+    comments_count: int
+
+
+class PopularPost(PostSummary):
+    views: int
+
+
 class PostCreate(BaseModel):
     title: str = Field(None, min_length=1, max_length=200)
     content: str = Field(None, min_length=1)
@@ -50,6 +66,42 @@ class CommentOut(BaseModel):
     created_at: str
 
 
+class AuthorOut(BaseModel):
+    id: int
+    username: str
+
+
+class PostDetail(BaseModel):
+    post: PostOut
+    author: AuthorOut
+    comments: list[CommentOut]
+    next_comments_cursor: Optional[str] = None
+
+
+class CategoryOut(BaseModel):
+    name: str
+    count: int
+    latest_at: Optional[str] = None
+
+
+class PostBatchUpdate(BaseModel):
+    id: int
+    title: Optional[str] = Field(None, min_length=1, max_length=200)
+    content: Optional[str] = Field(None, min_length=1)
+    category: Optional[str] = None
+
+
+class CommentBatchUpdate(BaseModel):
+    id: int
+    text: str = Field(..., min_length=1)
+
+
+class BatchItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
 # Новые схемы
 class UserBase(BaseModel):
     username: str
@@ -1,16 +1,141 @@
-from sqlalchemy import create_engine
+import os
+import sqlite3
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from settings import (
+    SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE,
+    DB_READ_SPLIT, DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, DB_WRITE_POOL_SIZE, DB_POOL_RECYCLE, DB_POOL_TIMEOUT
+)
+from database.instrumentation import instrument
 
-DATABASE_URL = "sqlite:///../db.sqlite3"
+# По умолчанию - база Django в корне репозитория, независимо от текущего каталога
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "db.sqlite3")
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DEFAULT_DATABASE}")
 
+# sqlite:///:memory: - база в общей памяти процесса для тестов: все соединения пулов
+# видят одни и те же данные, пока открыто хотя бы одно из них
+MEMORY = make_url(DATABASE_URL).database in (None, "", ":memory:")
+if MEMORY:
+    _MEMORY_NAME = f"file:web_memdb_{os.getpid()}?mode=memory&cache=shared"
+    _keepalive = sqlite3.connect(_MEMORY_NAME, uri=True, check_same_thread=False)
+    DATABASE_URL = f"sqlite:///{_MEMORY_NAME}&uri=true"
+    READ_DATABASE_URL = DATABASE_URL
+else:
+    # Читающие соединения открываются только на чтение: запись через них невозможна
+    READ_DATABASE_URL = os.getenv("READ_DATABASE_URL", f"sqlite:///file:{make_url(DATABASE_URL).database}?mode=ro&uri=true")
+
+
+def _async_url(url: str):
+    return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(DATABASE_URL))
+ASYNC_READ_DATABASE_URL = _async_url(READ_DATABASE_URL)
+
+
+# WAL позволяет читать параллельно с записью; synchronous=NORMAL в WAL безопасен
+# для целостности и не делает fsync на каждый commit
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+
+def _set_read_pragmas(dbapi_connection, connection_record):
+    # Режим журнала задает писатель, он хранится в самом файле базы
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=1")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    if MEMORY:
+        # В общем кэше чтение иначе берет блокировки таблиц и мешает писателю
+        cursor.execute("PRAGMA read_uncommitted=1")
+    cursor.close()
+
+
+def make_engine(url: str, pool_size: int, max_overflow: int, readonly: bool = False, asynchronous: bool = False):
+    options = {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    # Пул с очередью явно: для базы в памяти SQLAlchemy иначе выбрал бы одно соединение на поток
+    if asynchronous:
+        new_engine = create_async_engine(url, poolclass=AsyncAdaptedQueuePool, **options)
+        sync_engine = new_engine.sync_engine
+    else:
+        new_engine = create_engine(url, poolclass=QueuePool, connect_args={"check_same_thread": False}, **options)
+        sync_engine = new_engine
+
+    event.listen(sync_engine, "connect", _set_read_pragmas if readonly else _set_sqlite_pragmas)
+    # Число запросов и время в базе для заголовка Server-Timing
+    instrument(sync_engine)
+    return new_engine
+
+
+# DB_READ_SPLIT=1: GET-запросы читают через пул соединений только для чтения, а все
+# записи идут через отдельный маленький пул писателя (по умолчанию одно соединение):
+# SQLite все равно пускает одного писателя, и ждать его лучше в очереди пула,
+# чем на блокировке базы. Чтения в WAL при этом писателя не ждут
+if DB_READ_SPLIT:
+    engine = make_engine(DATABASE_URL, DB_WRITE_POOL_SIZE, 0)
+    read_engine = make_engine(READ_DATABASE_URL, DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, readonly=True)
+    # Асинхронный путь (DB_MODE=async): обработчики не уходят в пул потоков
+    async_engine = make_engine(ASYNC_DATABASE_URL, DB_WRITE_POOL_SIZE, 0, asynchronous=True)
+    async_read_engine = make_engine(
+        ASYNC_READ_DATABASE_URL, DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, readonly=True, asynchronous=True
+    )
+else:
+    engine = read_engine = make_engine(DATABASE_URL, DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW)
+    async_engine = async_read_engine = make_engine(
+        ASYNC_DATABASE_URL, DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, asynchronous=True
+    )
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread":False})
 session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+read_session = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+async_session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+async_read_session = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+
+if MEMORY:
+    # В пустой памяти нет таблиц Django; индексы и FTS добавит migrate() при старте
+    from database.models import Base
+    Base.metadata.create_all(engine)
 
 
-def get_db():
-    db = session()
+READ_METHODS = frozenset({"GET", "HEAD"})
+
+
+def get_db(request: Request):
+    db = (read_session if request.method in READ_METHODS else session)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db(request: Request):
+    async with (async_read_session if request.method in READ_METHODS else async_session)() as db:
+        yield db
+
+
+# Для POST-маршрутов, которые только читают (вход, обновление токена): им незачем
+# занимать соединение писателя, тем более на время хеширования пароля
+def get_read_db():
+    db = read_session()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_read_db():
+    async with async_read_session() as db:
+        yield db
@@ -0,0 +1,111 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from settings import SQL_STATS, SQL_NPLUS1_THRESHOLD, SQL_NPLUS1_RAISE
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+# Статистика запросов к базе в рамках одного HTTP-запроса
+class QueryStats:
+    __slots__ = ("count", "total", "slowest", "slowest_statement", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+        self.shapes = Counter()
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.total * 1000:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest * 1000:.2f}"
+        )
+
+
+# Контекст копируется и в пул потоков Starlette, и в гринлеты async-движка,
+# поэтому обработчики событий видят объект текущего запроса
+_current: ContextVar[None | QueryStats] = ContextVar("query_stats", default=None)
+
+# IN (?, ?, ?) с разным числом параметров - один и тот же запрос
+_IN_LIST = re.compile(r"\(\?(?:, \?)*\)")
+
+
+def statement_shape(statement: str):
+    return _IN_LIST.sub("(?)", statement)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+
+    context._query_started = time.perf_counter()
+    if not SQL_NPLUS1_THRESHOLD:
+        return
+
+    shape = statement_shape(statement)
+    stats.shapes[shape] += 1
+    # Сообщаем один раз, когда порог только что превышен
+    if stats.shapes[shape] == SQL_NPLUS1_THRESHOLD + 1:
+        message = f"N+1: запрос выполнен больше {SQL_NPLUS1_THRESHOLD} раз за один HTTP-запрос: {shape}"
+        if SQL_NPLUS1_RAISE:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_query_started", None)
+    if stats is None or started is None:
+        return
+
+    elapsed = time.perf_counter() - started
+    stats.count += 1
+    stats.total += elapsed
+    if elapsed > stats.slowest:
+        stats.slowest = elapsed
+        stats.slowest_statement = statement
+
+
+def instrument(engine):
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+class QueryStatsMiddleware:
+    # Чистый ASGI, как и JWTAuthMiddleware: заголовок добавляется в http.response.start
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_STATS:
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+                if stats.count:
+                    logger.debug(
+                        "%s %s: %d queries, %.2f ms, slowest %.2f ms: %s",
+                        scope["method"], scope["path"], stats.count,
+                        stats.total * 1000, stats.slowest * 1000, stats.slowest_statement
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,149 @@
+import sys
+from contextlib import contextmanager
+from sqlalchemy import inspect, text
+from settings import EXCERPT_LENGTH, MIGRATION_LOCK_TIMEOUT
+from database.models import WriteVersion, Post, Comment, PostViews
+
+
+# Таблицы принадлежат Django, поэтому свои колонки добавляем сами
+def _add_column(conn, table: str, column: str, ddl: str):
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column in columns:
+        return False
+
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def _ensure_index(conn, index):
+    # Django уже мог создать индекс с теми же ведущими колонками под своим именем
+    columns = [column.name for column in index.columns]
+    for existing in inspect(conn).get_indexes(index.table.name):
+        if existing["column_names"][:len(columns)] == columns:
+            return False
+
+    index.create(conn)
+    return True
+
+
+# Внешний контент: FTS хранит только индекс, текст читается из основной таблицы.
+# Триггеры держат индекс в актуальном состоянии при любой записи, в том числе из Django
+def _ensure_fts(conn, table: str, columns: list[str]):
+    fts = f"{table}_fts"
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts}
+    ).first()
+
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, "
+        f"content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END"
+    ))
+
+    if not exists:
+        rebuild_fts(conn, table)
+
+
+def rebuild_fts(conn, table: str):
+    conn.execute(text(f"INSERT INTO {table}_fts({table}_fts) VALUES ('rebuild')"))
+
+
+def rebuild_search(conn):
+    rebuild_fts(conn, "main_post")
+    rebuild_fts(conn, "main_comment")
+
+
+def reconcile_comment_counts(conn):
+    # Пересчет с нуля, например после массового импорта комментариев
+    conn.execute(text(
+        "UPDATE main_post SET comments_count = "
+        "(SELECT COUNT(*) FROM main_comment WHERE main_comment.post_id = main_post.id)"
+    ))
+
+
+@contextmanager
+def _write_locked(engine):
+    # Воркеры uvicorn стартуют одновременно. pysqlite не открывает транзакцию
+    # перед DDL, поэтому берем блокировку записи сами до проверки схемы:
+    # второй воркер дождется первого и увидит уже обновленную схему
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        # Соединение вернется в пул писателя: долгое ожидание блокировки нужно только миграции
+        busy_timeout = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT * 1000}")
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+        finally:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {busy_timeout}")
+
+
+def migrate(engine):
+    with _write_locked(engine) as conn:
+        _migrate(conn)
+
+
+def _migrate(conn):
+    _add_column(conn, "main_post", "excerpt", "VARCHAR(300)")
+    # Посты, созданные через Django, приходят без превью
+    conn.execute(
+        text("UPDATE main_post SET excerpt = substr(content, 1, :n) WHERE excerpt IS NULL"),
+        {"n": EXCERPT_LENGTH}
+    )
+
+    if _add_column(conn, "main_post", "comments_count", "INTEGER NOT NULL DEFAULT 0"):
+        reconcile_comment_counts(conn)
+
+    WriteVersion.__table__.create(conn, checkfirst=True)
+    PostViews.__table__.create(conn, checkfirst=True)
+
+    for index in [*Post.__table__.indexes, *Comment.__table__.indexes, *PostViews.__table__.indexes]:
+        _ensure_index(conn, index)
+
+    _ensure_fts(conn, "main_post", ["title", "content"])
+    _ensure_fts(conn, "main_comment", ["text"])
+
+
+def _in_transaction(command):
+    def run(engine):
+        with _write_locked(engine) as conn:
+            command(conn)
+    return run
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "reconcile-comments": _in_transaction(reconcile_comment_counts),
+    "rebuild-search": _in_transaction(rebuild_search),
+}
+
+
+# python -m database.migrations reconcile-comments
+if __name__ == "__main__":
+    from database.database import engine
+
+    name = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if name not in COMMANDS:
+        sys.exit(f"Неизвестная команда: {name}. Доступны: {', '.join(COMMANDS)}")
+
+    COMMANDS[name](engine)
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index
 from datetime import datetime
 
 class Base(DeclarativeBase):
@@ -28,8 +28,17 @@ class Post(Base):
     title = Column(String(200))
     category = Column(String(20))
     content = Column(Text)
+    excerpt = Column(String(300))
     author_id = Column(Integer)
     created_at = Column(DateTime)
+    comments_count = Column(Integer, nullable=False, default=0)
+
+    # Индексы под фильтрацию и keyset-сортировку; на базе Django их создает миграция
+    __table_args__ = (
+        Index("main_post_created_idx", "created_at", "id"),
+        Index("main_post_category_created_idx", "category", "created_at", "id"),
+        Index("main_post_author_idx", "author_id"),
+    )
 
 
 class Comment(Base):
@@ -39,4 +48,29 @@ class Comment(Base):
     created_at = Column(DateTime)
     text = Column(Text)
     post_id = Column(Integer)
-    author_id = Column(Integer)
\ No newline at end of file
+    author_id = Column(Integer)
+
+    __table_args__ = (
+        Index("main_comment_post_created_idx", "post_id", "created_at"),
+        Index("main_comment_author_idx", "author_id"),
+    )
+
+# Версии данных для ETag: увеличиваются в той же транзакции, что и запись
+class WriteVersion(Base):
+    __tablename__ = "api_write_version"
+
+    scope = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Счетчики просмотров постов: пишутся пачками из памяти воркеров (api/view_counter.py)
+class PostViews(Base):
+    __tablename__ = "api_post_views"
+
+    post_id = Column(Integer, primary_key=True)
+    views = Column(Integer, nullable=False, default=0)
+
+    # Рейтинг читается по индексу сверху вниз, без сортировки всей таблицы
+    __table_args__ = (
+        Index("api_post_views_rank_idx", "views", "post_id"),
+    )
@@ -0,0 +1,88 @@
+import hashlib
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from cache import cache
+
+# Версии пишутся по тем же именам, что и теги кэша: post:<id>, comments:<id>.
+# Состав списков версионируется отдельно для каждой категории (list:<категория>)
+# и для общего списка (list:*): новый пост в одной категории не трогает остальные
+
+_BUMP = text(
+    "INSERT INTO api_write_version (scope, version) VALUES (:scope, 1) "
+    "ON CONFLICT(scope) DO UPDATE SET version = version + 1"
+)
+_VERSION = text("SELECT version FROM api_write_version WHERE scope = :scope")
+
+
+def bump(db: Session, *scopes: str):
+    # Вызывается до commit, чтобы версия менялась атомарно с данными
+    db.execute(_BUMP, [{"scope": scope} for scope in scopes])
+
+
+async def bump_async(db: AsyncSession, *scopes: str):
+    await db.execute(_BUMP, [{"scope": scope} for scope in scopes])
+
+
+def version(db: Session, scope: str):
+    return db.execute(_VERSION, {"scope": scope}).scalar() or 0
+
+
+async def version_async(db: AsyncSession, scope: str):
+    return (await db.execute(_VERSION, {"scope": scope})).scalar() or 0
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def _matches(request: Request, etag: str):
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+
+    # Слабое сравнение: сжатые ответы отдаются с W/-версией того же ETag
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# Браузер хранит ответ, но каждый раз сверяется с сервером по ETag
+CACHE_CONTROL = "private, no-cache"
+
+
+def _lookup(request: Request, key, etag: str):
+    if _matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    cached = cache.get(key, etag)
+    if cached:
+        return cached.response(request.headers.get("Accept-Encoding"))
+    return None
+
+
+def _store(request: Request, key, etag: str, entry, tags):
+    entry.etag = etag
+    entry.headers["ETag"] = etag
+    entry.headers["Cache-Control"] = CACHE_CONTROL
+    return cache.set(key, entry, tags).response(request.headers.get("Accept-Encoding"))
+
+
+def conditional(request: Request, key, etag: str, build):
+    # build() возвращает (CachedResponse, теги) и вызывается только при промахе
+    response = _lookup(request, key, etag)
+    if response is not None:
+        return response
+
+    entry, tags = build()
+    return _store(request, key, etag, entry, tags)
+
+
+async def conditional_async(request: Request, key, etag: str, build):
+    response = _lookup(request, key, etag)
+    if response is not None:
+        return response
+
+    entry, tags = await build()
+    return _store(request, key, etag, entry, tags)
@@ -0,0 +1,35 @@
+import json
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from settings import FAST_JSON
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Быстрый путь (FAST_JSON=1): списки собираются словарями прямо из строк SQL и кодируются
+# orjson, без Pydantic-моделей и jsonable_encoder. Схема OpenAPI берется из response_model
+# маршрутов и не меняется. Без orjson работает тот же путь на стандартном json
+
+
+def _default(value):
+    # Отдельные ответы (например, PostDetail) по-прежнему собираются моделями
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(data, fast: bool = FAST_JSON) -> bytes:
+    if not fast:
+        return JSONResponse(jsonable_encoder(data)).body
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def json_response(data, headers: None | dict = None):
+    return Response(dumps(data), media_type="application/json", headers=headers)
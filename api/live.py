@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import os
+from collections import deque
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from database.models import User
+from fastjson import dumps
+from settings import LIVE_HEARTBEAT, LIVE_QUEUE_SIZE, LIVE_HISTORY, LIVE_MAX_SUBSCRIBERS, LIVE_STREAM_TTL
+
+# Живые комментарии через SSE. Брокер живет в памяти процесса: событие доходит
+# до подписчиков того же воркера. Подписчик - это очередь и ожидающий ее генератор,
+# без потоков и соединений с базой, поэтому тысячи открытых страниц почти ничего не стоят
+
+# Префикс id событий: после перезапуска старый Last-Event-ID не совпадет и клиент перечитает список
+_BOOT = os.urandom(4).hex()
+
+RETRY = b"retry: 3000\n\n"
+HEARTBEAT = b": ping\n\n"
+RESET = b"event: reset\ndata: {}\n\n"
+
+
+class _Subscriber:
+    __slots__ = ("queue", "closed")
+
+    def __init__(self):
+        self.queue = asyncio.Queue(LIVE_QUEUE_SIZE)
+        self.closed = False
+
+
+class CommentBroker:
+    def __init__(self):
+        self._subscribers = {}  # post_id -> set подписчиков
+        # Последние события всех постов для переподключения с Last-Event-ID
+        self._history = deque(maxlen=LIVE_HISTORY)  # (seq, post_id, frame)
+        self._seq = itertools.count(1)
+        self._loop = None
+        self.count = 0
+        self.dropped = 0
+
+    @property
+    def active(self):
+        # До первой подписки в этом воркере публиковать некому
+        return self._loop is not None
+
+    def publish(self, post_id: int, event: str, data: dict):
+        # Вызывается после commit, в том числе из потоков синхронных обработчиков;
+        # раздача идет в цикле событий, где живут очереди
+        if self._loop is None:
+            return
+        payload = dumps(data, fast=True)
+        try:
+            self._loop.call_soon_threadsafe(self._fanout, post_id, event, payload)
+        except RuntimeError:
+            # Цикл событий уже закрыт (остановка приложения)
+            self._loop = None
+
+    def _fanout(self, post_id: int, event: str, payload: bytes):
+        seq = next(self._seq)
+        frame = f"id: {_BOOT}-{seq}\nevent: {event}\ndata: ".encode() + payload + b"\n\n"
+        self._history.append((seq, post_id, frame))
+        for subscriber in self._subscribers.get(post_id, ()):
+            self._deliver(subscriber, frame)
+
+    def _deliver(self, subscriber: _Subscriber, frame: bytes):
+        if subscriber.closed:
+            return
+        try:
+            subscriber.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Медленный клиент: не копим для него события без предела, а отбрасываем
+            # очередь и просим перечитать список; браузер переподключится сам
+            self.dropped += 1
+            subscriber.closed = True
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(RESET)
+
+    def _replay(self, subscriber: _Subscriber, post_id: int, last_event_id: str):
+        boot, _, seq = last_event_id.partition("-")
+        if boot != _BOOT or not seq.isdigit() or not self._history or int(seq) < self._history[0][0] - 1:
+            # События между отключением и переподключением уже не восстановить
+            self._deliver(subscriber, RESET)
+            return
+
+        for event_seq, event_post_id, frame in self._history:
+            if event_seq > int(seq) and event_post_id == post_id:
+                self._deliver(subscriber, frame)
+
+    def _subscribe(self, post_id: int, last_event_id: None | str):
+        self._loop = asyncio.get_running_loop()
+        subscriber = _Subscriber()
+        self._subscribers.setdefault(post_id, set()).add(subscriber)
+        self.count += 1
+        if last_event_id:
+            self._replay(subscriber, post_id, last_event_id)
+        return subscriber
+
+    def _unsubscribe(self, post_id: int, subscriber: _Subscriber):
+        subscribers = self._subscribers.get(post_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[post_id]
+        self.count -= 1
+
+    async def stream(self, post_id: int, last_event_id: None | str):
+        subscriber = self._subscribe(post_id, last_event_id)
+        loop = asyncio.get_running_loop()
+        # Поток закрывается сам через LIVE_STREAM_TTL: иначе открытые соединения не дают
+        # uvicorn завершиться, а клиент переподключится и получит пропущенное из истории
+        deadline = loop.time() + LIVE_STREAM_TTL
+        try:
+            yield RETRY
+            while not subscriber.closed or not subscriber.queue.empty():
+                timeout = min(LIVE_HEARTBEAT, deadline - loop.time())
+                if timeout <= 0:
+                    break
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    # Комментарий SSE: держит соединение через прокси, браузер его игнорирует
+                    yield HEARTBEAT
+                    continue
+                yield frame
+        finally:
+            self._unsubscribe(post_id, subscriber)
+
+
+broker = CommentBroker()
+
+
+def stream_response(post_id: int, last_event_id: None | str):
+    if broker.count >= LIVE_MAX_SUBSCRIBERS:
+        raise HTTPException(status_code=503, detail="Too many live subscribers")
+
+    return StreamingResponse(
+        broker.stream(post_id, last_event_id),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx не должен копить события в буфере
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def publish_comments(db, event: str, comments):
+    if not broker.active or not comments:
+        return
+
+    # Имена авторов одним запросом на всю группу
+    authors = dict(db.execute(
+        select(User.id, User.username).where(User.id.in_({comment.author_id for comment in comments}))
+    ).all())
+    for comment in comments:
+        broker.publish(comment.post_id, event, {
+            "id": comment.id,
+            "post_id": comment.post_id,
+            "text": comment.text,
+            "author_name": authors.get(comment.author_id) or "Unknown",
+            "created_at": comment.created_at.isoformat() if comment.created_at else "",
+        })
+
+
+def publish_comment(db, event: str, comment):
+    publish_comments(db, event, [comment])
+
+
+def publish_deleted(post_id: int, id: int):
+    broker.publish(post_id, "deleted", {"id": id, "post_id": post_id})
+
+
+def publish_reset(post_ids):
+    # Пакетные записи: проще попросить клиентов перечитать список, чем слать сотни событий
+    for post_id in post_ids:
+        broker.publish(post_id, "reset", {})
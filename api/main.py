@@ -1,15 +1,44 @@
-from database.database import get_db
-from database.models import Post
+from contextlib import asynccontextmanager
+from database.database import get_db, engine, async_engine, read_engine, async_read_engine, read_session
+from database.migrations import migrate
 from fastapi import FastAPI, Depends
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from crud.post import post_router
-from crud.comments import comment_router
-from crud.auth import router as auth_router
-from auth import JWTAuthMiddleware
+from settings import DB_MODE, COMMENT_WRITER
+from auth import JWTAuthMiddleware, shutdown_hash_pool
+from database.instrumentation import QueryStatsMiddleware
+from compression import CompressionMiddleware
+from admission import AdmissionMiddleware
+from profiling import ProfilingMiddleware, ProfiledRoute, PROFILE_ENABLED
+from metrics import MetricsMiddleware, instrument_pool, metrics_response, mark_worker_stopped
+from cache import cache
+from catalog import catalog
+from comment_writer import writer as comment_writer
+from view_counter import view_counter
+from crud.schemas import CategoryOut
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    migrate(engine)
+    with read_session() as db:
+        catalog.rebuild(db)
+        view_counter.refresh(db)
+    if COMMENT_WRITER == "group":
+        comment_writer.start()
+    yield
+    comment_writer.stop()
+    view_counter.stop()
+    shutdown_hash_pool()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+    mark_worker_stopped()
+
+
+app = FastAPI(lifespan=lifespan)
+# Синхронные маршруты самого приложения (категории) тоже профилируются в своем потоке
+app.router.route_class = ProfiledRoute
 
 
 app.add_middleware(
@@ -18,10 +47,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Разрешаем все методы включая OPTIONS
     allow_headers=["*"],  # Разрешаем все заголовки
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "ETag", "Server-Timing"],
 )
 
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(JWTAuthMiddleware)
+# Внутри контроля допуска: время в его очереди в профиль не попадает
+if PROFILE_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+# Снаружи JWT: отказ при перегрузке не тратит время даже на проверку токена
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+instrument_pool(engine, "sync")
+instrument_pool(async_engine.sync_engine, "async")
+if read_engine is not engine:
+    instrument_pool(read_engine, "sync_read")
+    instrument_pool(async_read_engine.sync_engine, "async_read")
+
 
+# Синхронный и асинхронный пути оставлены оба, чтобы их можно было сравнить
+if DB_MODE == "async":
+    from crud.async_post import post_router
+    from crud.async_comments import comment_router
+    from crud.async_auth import router as auth_router
+else:
+    from crud.post import post_router
+    from crud.comments import comment_router
+    from crud.auth import router as auth_router
 
 app.include_router(post_router, prefix="/articles", tags=["posts"])
 app.include_router(comment_router, prefix="/comments", tags=["comments"])
@@ -31,7 +85,25 @@ app.include_router(auth_router, tags=["authentication"])
 def get_root():
     return HTMLResponse("<h2>API ВКЛЮЧЕНО</h2>")
 
+# Категории отдаются из каталога в памяти; база нужна только для пересборки
 @app.get("/categories/")
 def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Post.category).distinct().all()
-    return [category[0] for category in categories]
\ No newline at end of file
+    return catalog.names(db)
+
+@app.get("/categories/summary", response_model=list[CategoryOut])
+def get_categories_summary(db: Session = Depends(get_db)):
+    return catalog.summary(db)
+
+@app.post("/categories/rebuild", response_model=list[CategoryOut])
+def rebuild_categories(db: Session = Depends(get_db)):
+    # Например, после импорта постов в обход API
+    catalog.rebuild(db)
+    return catalog.summary(db)
+
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return metrics_response()
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    return cache.stats()
\ No newline at end of file
@@ -0,0 +1,158 @@
+import os
+import time
+from fastapi import Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from settings import METRICS_REFRESH
+
+# Метрики Prometheus. При нескольких воркерах uvicorn нужно задать PROMETHEUS_MULTIPROC_DIR
+# (пустой каталог): каждый процесс пишет значения в свои mmap-файлы, а /metrics
+# в любом воркере суммирует их по всем процессам
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP-запросы по маршрутам и кодам ответа",
+    ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds", "Время обработки запроса, включая отправку тела",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+IN_PROGRESS = Gauge("http_requests_in_progress", "Запросы в обработке", multiprocess_mode="livesum")
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Соединения, выданные из пула", ["engine"], multiprocess_mode="livesum"
+)
+HASH_QUEUE = Gauge("password_hash_queue_depth", "Задачи хеширования паролей в очереди", multiprocess_mode="livesum")
+# У каждого воркера свой кэш: счетчики суммируются, доля попаданий - по процессам (метка pid)
+CACHE_HITS = Gauge("response_cache_hits", "Попадания в кэш ответов", multiprocess_mode="livesum")
+CACHE_MISSES = Gauge("response_cache_misses", "Промахи кэша ответов", multiprocess_mode="livesum")
+CACHE_SIZE = Gauge("response_cache_size", "Записей в кэше ответов", multiprocess_mode="livesum")
+CACHE_HIT_RATIO = Gauge("response_cache_hit_ratio", "Доля попаданий в кэш ответов", multiprocess_mode="liveall")
+LIVE_SUBSCRIBERS = Gauge("live_comment_subscribers", "Открытые SSE-потоки комментариев", multiprocess_mode="livesum")
+LIVE_DROPPED = Gauge("live_comment_dropped", "Медленные SSE-клиенты, получившие reset", multiprocess_mode="livesum")
+COMMENT_QUEUE = Gauge("comment_writer_queue_depth", "Комментарии, ждущие группового commit", multiprocess_mode="livesum")
+COMMENT_BATCH_SIZE = Histogram(
+    "comment_writer_batch_size", "Записей в одной транзакции группового commit",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+VIEWS_PENDING = Gauge("post_views_pending", "Посты с просмотрами, еще не записанными в базу", multiprocess_mode="livesum")
+ADMISSION_ACTIVE = Gauge(
+    "admission_active", "Запросы, допущенные к обработке, по классам маршрутов", ["route_class"], multiprocess_mode="livesum"
+)
+ADMISSION_WAITING = Gauge(
+    "admission_waiting", "Запросы в очереди допуска по классам маршрутов", ["route_class"], multiprocess_mode="livesum"
+)
+ADMISSION_QUEUE_TIME = Histogram(
+    "admission_queue_seconds", "Время ожидания в очереди допуска", ["route_class"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Отказы контроля допуска", ["route_class", "reason"]
+)
+
+
+def instrument_pool(engine, name: str):
+    gauge = DB_POOL_CHECKED_OUT.labels(name)
+    event.listen(engine, "checkout", lambda *args: gauge.inc())
+    event.listen(engine, "checkin", lambda *args: gauge.dec())
+
+
+_refreshed_at = 0.0
+
+
+def refresh_components():
+    # Счетчики компонентов живут в памяти процесса; копируем их в метрики
+    # не чаще раза в METRICS_REFRESH секунд, чтобы не платить за это на каждом запросе
+    global _refreshed_at
+    now = time.monotonic()
+    if now - _refreshed_at < METRICS_REFRESH:
+        return
+    _refreshed_at = now
+
+    from auth import hash_queue_depth
+    from cache import cache
+    from live import broker
+    from comment_writer import writer
+    from admission import stats as admission_stats
+    from view_counter import view_counter
+
+    HASH_QUEUE.set(hash_queue_depth())
+    stats = cache.stats()
+    CACHE_HITS.set(stats["hits"])
+    CACHE_MISSES.set(stats["misses"])
+    CACHE_SIZE.set(stats["size"])
+    CACHE_HIT_RATIO.set(stats["hit_ratio"])
+    LIVE_SUBSCRIBERS.set(broker.count)
+    LIVE_DROPPED.set(broker.dropped)
+    COMMENT_QUEUE.set(writer.depth())
+    VIEWS_PENDING.set(view_counter.pending())
+    for name, budget in admission_stats().items():
+        ADMISSION_ACTIVE.labels(name).set(budget["active"])
+        ADMISSION_WAITING.labels(name).set(budget["waiting"])
+
+
+def metrics_response():
+    global _refreshed_at
+    _refreshed_at = 0.0
+    refresh_components()
+
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_stopped():
+    # live-метрики остановленного воркера не должны попадать в сумму
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+# labels() берет блокировку и ищет серию по словарю; дочерние метрики кэшируем,
+# число ключей ограничено числом маршрутов
+_series = {}
+
+
+def _route_series(method: str, route: str, status: int):
+    key = (method, route, status)
+    series = _series.get(key)
+    if series is None:
+        series = _series[key] = (LATENCY.labels(method, route), REQUESTS.labels(method, route, str(status)))
+    return series
+
+
+class MetricsMiddleware:
+    # Чистый ASGI: на запрос - perf_counter, счетчик и наблюдение гистограммы
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            IN_PROGRESS.dec()
+            # Шаблон маршрута, а не сам путь: иначе каждый id - отдельная серия
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            latency, requests = _route_series(scope["method"], path, status)
+            latency.observe(time.perf_counter() - started)
+            requests.inc()
+            refresh_components()
@@ -0,0 +1,175 @@
+import asyncio
+import cProfile
+import functools
+import hmac
+import itertools
+import logging
+import os
+import pstats
+import random
+import re
+import time
+from contextvars import ContextVar
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from settings import PROFILE_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_DIR, PROFILE_TOP
+
+logger = logging.getLogger(__name__)
+
+# Профилирование одного запроса по требованию. Запрос с заголовком X-Profile: <PROFILE_TOKEN>
+# (или случайный - с вероятностью PROFILE_SAMPLE_RATE) выполняется под cProfile до начала
+# ответа. Полный профиль сохраняется в PROFILE_DIR в формате pstats (snakeviz, flameprof).
+# Запросу с токеном в ответ добавляются общее время (Server-Timing: profile), время ожидания
+# цикла событий (profile-wait), имя файла профиля и самые тяжелые функции по собственному времени.
+# cProfile видит только свой поток. Поэтому обработчики из пула потоков (синхронные
+# маршруты) профилируются отдельно через ProfiledRoute, и профили потоков складываются.
+# В потоке цикла событий профиль один: в него попадают и шаги параллельных запросов
+
+PROFILE_ENABLED = bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+HEADER = b"x-profile"
+
+_current = ContextVar("profile_run", default=None)
+_ids = itertools.count(1)
+
+
+class _Run:
+    __slots__ = ("thread_profiles",)
+
+    def __init__(self):
+        self.thread_profiles = []
+
+
+def profile_calls(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Контекст запроса копируется в поток пула вместе с _current
+        run = _current.get()
+        if run is None:
+            return func(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            run.thread_profiles.append(profiler)
+
+    wrapper.profiled = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    # Без настроенного профилирования обработчики не оборачиваются. include_router
+    # пересоздает маршрут с уже обернутым обработчиком: второй cProfile в том же
+    # потоке сломал бы первый (а в Python 3.12+ упал бы с ValueError)
+    def __init__(self, path: str, endpoint, **kwargs):
+        if PROFILE_ENABLED and not asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, "profiled", False):
+            endpoint = profile_calls(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _requested(scope):
+    if not PROFILE_TOKEN:
+        return False
+    for name, value in scope["headers"]:
+        if name == HEADER:
+            return hmac.compare_digest(value, PROFILE_TOKEN.encode())
+    return False
+
+
+def _idle(filename: str, name: str):
+    # Цикл событий ждет в epoll/select, пока работают поток пула, процесс хеширования или сеть
+    return filename == "~" and "select." in name
+
+
+def idle_time(stats: pstats.Stats):
+    return sum(entry[2] for (filename, _, name), entry in stats.stats.items() if _idle(filename, name))
+
+
+def hotspots(stats: pstats.Stats, top: int):
+    # Собственное время функции, без вызванных ею
+    entries = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+    result = []
+    for (filename, line, name), (_, _, tottime, _, _) in entries:
+        if "_lsprof.Profiler" in name or _idle(filename, name):
+            continue
+        where = f"{os.path.basename(filename)}:{line}" if line else filename
+        result.append(f"{name} ({where}) {tottime * 1000:.2f}ms")
+        if len(result) >= top:
+            break
+    # Значения заголовков - только latin-1
+    return ", ".join(result).encode("ascii", "backslashreplace").decode()
+
+
+def profile_path(scope):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_")[:60] or "root"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_ids)}-{scope['method']}-{slug}.prof"
+    return os.path.join(PROFILE_DIR, name)
+
+
+class ProfilingMiddleware:
+    # Подключается только при PROFILE_ENABLED; остальные запросы проходят без профилировщика
+    def __init__(self, app):
+        self.app = app
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        requested = _requested(scope)
+        sampled = not requested and PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        if not (requested or sampled) or self._busy:
+            # Второй профилировщик в потоке цикла событий заменил бы первый
+            return await self.app(scope, receive, send)
+
+        self._busy = True
+        run = _Run()
+        token = _current.set(run)
+        path = profile_path(scope)
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        result = {}
+
+        def finish():
+            if not result:
+                profiler.disable()
+                result["elapsed"] = time.perf_counter() - started
+                stats = pstats.Stats(profiler)
+                for thread_profile in run.thread_profiles:
+                    stats.add(thread_profile)
+                result["stats"] = stats
+            return result
+
+        async def send_with_profile(message):
+            # Профиль заканчивается с началом ответа: тело (например, поток SSE) в него не входит
+            if message["type"] == "http.response.start" and not result:
+                finish()
+                if requested:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", f"profile;dur={result['elapsed'] * 1000:.2f}")
+                    headers.append("Server-Timing", f"profile-wait;dur={idle_time(result['stats']) * 1000:.2f}")
+                    headers["X-Profile-Id"] = os.path.basename(path)
+                    headers["X-Profile-Hotspots"] = hotspots(result["stats"], PROFILE_TOP)
+            await send(message)
+
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            finish()
+            _current.reset(token)
+            self._busy = False
+            self._save(scope, path, result)
+
+    def _save(self, scope, path: str, result):
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            result["stats"].dump_stats(path)
+        except OSError:
+            logger.exception("Could not save profile to %s", path)
+            return
+        logger.info(
+            "Profiled %s %s in %.1f ms: %s", scope["method"], scope["path"], result["elapsed"] * 1000, path
+        )
@@ -0,0 +1,117 @@
+import os
+
+# Пагинация статей
+ARTICLES_PAGE_MAX = int(os.getenv("ARTICLES_PAGE_MAX", 100))
+# Размер страницы, если limit не передан: список без limit тоже постраничный
+ARTICLES_PAGE_SIZE = min(int(os.getenv("ARTICLES_PAGE_SIZE", 20)), ARTICLES_PAGE_MAX)
+
+# Длина превью поста для облегченного списка
+EXCERPT_LENGTH = int(os.getenv("EXCERPT_LENGTH", 150))
+
+# Кэш ответов на чтение
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", 1024))
+CACHE_TTL = float(os.getenv("CACHE_TTL", 30))
+
+# Пул процессов для хеширования паролей
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", os.cpu_count() or 2))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", 32))
+
+# Кэш проверенных JWT
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 4096))
+
+# Режим работы с базой: "sync" (пул потоков Starlette) или "async" (aiosqlite)
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+# Настройки SQLite, применяются к каждому соединению
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# Отрицательное значение - размер в КиБ
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024))
+
+# Полнотекстовый поиск
+SEARCH_PAGE_MAX = int(os.getenv("SEARCH_PAGE_MAX", 50))
+
+# Пагинация комментариев
+COMMENTS_PAGE_MAX = int(os.getenv("COMMENTS_PAGE_MAX", 100))
+# Сколько комментариев отдавать вместе с постом в /articles/{id}/detail
+DETAIL_COMMENTS = int(os.getenv("DETAIL_COMMENTS", 20))
+
+# Максимальный размер пакета в batch-эндпоинтах
+BATCH_MAX = int(os.getenv("BATCH_MAX", 1000))
+
+# Потоковая выгрузка: сколько строк читать из курсора за раз
+EXPORT_CHUNK = int(os.getenv("EXPORT_CHUNK", 1000))
+
+# Каталог категорий в памяти: как часто пересобирать его из базы
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", 300))
+
+# Учет SQL-запросов на каждый HTTP-запрос (заголовок Server-Timing)
+SQL_STATS = os.getenv("SQL_STATS", "1") == "1"
+# Детектор N+1 для разработки и тестов: 0 - выключен, иначе предупреждение (или
+# исключение при SQL_NPLUS1_RAISE=1), когда один запрос повторяется больше N раз
+SQL_NPLUS1_THRESHOLD = int(os.getenv("SQL_NPLUS1_THRESHOLD", 0))
+SQL_NPLUS1_RAISE = os.getenv("SQL_NPLUS1_RAISE", "0") == "1"
+
+# Сколько секунд воркер ждет, пока другой воркер закончит миграцию при старте
+MIGRATION_LOCK_TIMEOUT = int(os.getenv("MIGRATION_LOCK_TIMEOUT", 600))
+
+# Метрики: как часто копировать состояние кэша и очереди хеширования в /metrics
+METRICS_REFRESH = float(os.getenv("METRICS_REFRESH", 1))
+
+# Быстрая сериализация списков: словари из строк SQL и orjson вместо Pydantic
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+# Сжатие ответов (gzip, br при установленном brotli): ответы меньше порога отдаются как есть
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+
+# Живые комментарии (SSE): интервал пинга, очередь на подписчика (при переполнении
+# медленный клиент получает reset), история для Last-Event-ID и лимиты на воркер
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", 15))
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", 64))
+LIVE_HISTORY = int(os.getenv("LIVE_HISTORY", 1000))
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", 10000))
+LIVE_STREAM_TTL = float(os.getenv("LIVE_STREAM_TTL", 300))
+
+# Запись комментариев: direct - каждый запрос в своей транзакции, group - через один
+# поток-писатель, который фиксирует до COMMENT_BATCH_MAX записей за окно в несколько мс
+COMMENT_WRITER = os.getenv("COMMENT_WRITER", "direct")
+COMMENT_BATCH_MAX = int(os.getenv("COMMENT_BATCH_MAX", 64))
+COMMENT_BATCH_WINDOW_MS = float(os.getenv("COMMENT_BATCH_WINDOW_MS", 2))
+
+# Контроль допуска: одновременные запросы и длина очереди для входа, чтений и записей.
+# Запрос, прождавший в очереди дольше ADMISSION_MAX_WAIT_MS, получает 503/429 с Retry-After
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_AUTH_LIMIT = int(os.getenv("ADMISSION_AUTH_LIMIT", 8))
+ADMISSION_AUTH_QUEUE = int(os.getenv("ADMISSION_AUTH_QUEUE", 32))
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", 32))
+ADMISSION_READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", 128))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", 16))
+ADMISSION_WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", 128))
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", 500))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+
+# Пулы соединений SQLite: при DB_READ_SPLIT=1 чтения (GET) идут через пул только для чтения,
+# записи - через отдельный пул писателя из DB_WRITE_POOL_SIZE соединений.
+# DB_POOL_RECYCLE: через сколько секунд пересоздавать соединение (-1 - никогда)
+DB_READ_SPLIT = os.getenv("DB_READ_SPLIT", "1") == "1"
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 8))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", 16))
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", 1))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 3600))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+# Просмотры постов копятся в памяти воркера и раз в VIEWS_FLUSH_INTERVAL секунд пишутся
+# в базу одним upsert; /articles/popular отдает до POPULAR_TOP_K постов из готового рейтинга
+VIEWS_ENABLED = os.getenv("VIEWS_ENABLED", "1") == "1"
+VIEWS_FLUSH_INTERVAL = float(os.getenv("VIEWS_FLUSH_INTERVAL", 5))
+POPULAR_TOP_K = int(os.getenv("POPULAR_TOP_K", 50))
+
+# Профилирование отдельных запросов: запрос с заголовком X-Profile: <PROFILE_TOKEN> или
+# случайная доля PROFILE_SAMPLE_RATE запросов выполняется под cProfile, профиль пишется в PROFILE_DIR.
+# Пока не задан ни токен, ни доля, профилировщик не подключается вовсе
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", 5))
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Тесты работают на базе в памяти (DATABASE_URL=sqlite:///:memory:); переменная
+# должна быть задана до импорта database.database
+os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
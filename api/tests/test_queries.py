@@ -0,0 +1,95 @@
+import datetime
+import re
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from main import app
+from auth import create_access_token
+from cache import cache
+from database.database import session
+from database.models import User, Post, Comment
+from settings import EXCERPT_LENGTH, ARTICLES_PAGE_SIZE
+
+# Число SQL-запросов на один HTTP-запрос не должно расти вместе с числом постов:
+# сравниваем счетчик QueryStats из Server-Timing на 10 и на 10 000 постах
+
+SMALL, LARGE = 10, 10_000
+CATEGORIES = ["technology", "programming", "science", "other"]
+TEXT = "Пост про индекс и кэш"
+
+ENDPOINTS = [
+    "/articles/",
+    "/articles/?limit=10&summary=true",
+    "/articles/category/science?limit=10",
+    "/articles/{post_id}",
+    "/articles/{post_id}/detail",
+    "/articles/{post_id}/comments",
+    "/articles/{post_id}/comments?limit=20",
+    "/articles/search?q=индекс",
+    "/articles/search?q=индекс&in_comments=true",
+]
+
+
+def seed_posts(author_id: int, start: int, count: int):
+    now = datetime.datetime(2025, 1, 1)
+    posts = [
+        {
+            "title": f"Пост {number}",
+            "content": f"{TEXT} {number}",
+            "excerpt": f"{TEXT} {number}"[:EXCERPT_LENGTH],
+            "category": CATEGORIES[number % len(CATEGORIES)],
+            "author_id": author_id,
+            "created_at": now + datetime.timedelta(minutes=number),
+            "comments_count": 1,
+        }
+        for number in range(start, start + count)
+    ]
+    with session() as db:
+        ids = db.scalars(insert(Post).returning(Post.id), posts).all()
+        db.execute(insert(Comment), [
+            {"text": f"Комментарий про индекс {id}", "post_id": id, "author_id": author_id, "created_at": now}
+            for id in ids
+        ])
+        db.commit()
+    return ids
+
+
+def query_count(client: TestClient, url: str, headers: dict):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, (url, response.text)
+    match = re.search(r'desc="(\d+) queries"', response.headers["Server-Timing"])
+    return int(match.group(1))
+
+
+@pytest.fixture(scope="module")
+def counts():
+    with TestClient(app) as client:
+        with session() as db:
+            author_id = db.scalars(insert(User).returning(User.id), [{
+                "username": "tester", "email": "tester@example.com", "password": "!", "date_joined": datetime.datetime.now()
+            }]).one()
+            db.commit()
+        headers = {"Authorization": "Bearer " + create_access_token(author_id, "tester")}
+
+        post_id = seed_posts(author_id, 0, SMALL)[0]
+        small = {url: query_count(client, url.format(post_id=post_id), headers) for url in ENDPOINTS}
+
+        seed_posts(author_id, SMALL, LARGE - SMALL)
+        # Записи шли в обход API, поэтому кэш ответов о них не знает
+        cache.clear()
+        large = {url: query_count(client, url.format(post_id=post_id), headers) for url in ENDPOINTS}
+        first_page = client.get("/articles/", headers=headers)
+    return small, large, first_page
+
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_query_count_does_not_grow_with_posts(counts, url):
+    small, large, _ = counts
+    assert small[url] == large[url]
+
+
+def test_list_without_limit_is_paged(counts):
+    # Без limit приходит первая страница и курсор на следующую, а не все 10 000 постов
+    *_, first_page = counts
+    assert len(first_page.json()) == ARTICLES_PAGE_SIZE
+    assert first_page.headers["X-Next-Cursor"]
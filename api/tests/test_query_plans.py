@@ -0,0 +1,26 @@
+import pytest
+from sqlalchemy import text
+from database.database import engine
+from database.migrations import migrate
+from crud.query_plans import hot_queries, explain, full_scans
+
+# То же, что python -m crud.query_plans: горячие запросы не должны читать таблицу целиком
+
+
+@pytest.fixture(scope="module")
+def conn():
+    migrate(engine)
+    with engine.connect() as conn:
+        yield conn
+
+
+@pytest.mark.parametrize("name", list(hot_queries()))
+def test_hot_query_uses_index(conn, name):
+    plan = explain(conn, hot_queries()[name])
+    assert not full_scans(plan), plan
+
+
+def test_full_scan_is_detected(conn):
+    # Проверка самой проверки: по content индекса нет
+    plan = explain(conn, text("SELECT id FROM main_post WHERE content = 'x'"))
+    assert full_scans(plan) == ["SCAN main_post"]
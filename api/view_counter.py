@@ -0,0 +1,123 @@
+import logging
+import threading
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from database.database import session, read_session
+from database.models import Post, PostViews
+from crud import queries
+from settings import VIEWS_ENABLED, VIEWS_FLUSH_INTERVAL, POPULAR_TOP_K
+
+logger = logging.getLogger(__name__)
+
+# Счетчики просмотров. Запись в базу на каждый просмотр превратила бы каждое чтение
+# поста в транзакцию единственного писателя SQLite. Поэтому просмотр - это +1 в словаре
+# воркера, а фоновый поток раз в VIEWS_FLUSH_INTERVAL секунд пишет накопленное одним
+# upsert и пересчитывает рейтинг: первые POPULAR_TOP_K строк по индексу (views, post_id).
+# /articles/popular читает готовый рейтинг и достает только сами посты по ключу.
+# Рейтинг общий для всех воркеров: каждый видит в базе сброшенное остальными
+
+
+class ViewCounter:
+    def __init__(self, interval: float, top_k: int, enabled: bool = True):
+        self.interval = interval
+        self.top_k = top_k
+        self.enabled = enabled
+        self._pending = {}  # post_id -> просмотры с последнего сброса
+        self._top = []  # [(post_id, views)] по убыванию просмотров
+        self._thread = None
+        self._stopping = threading.Event()
+        # Словарь _pending пополняют обработчики, а забирает и подменяет поток сброса
+        self._lock = threading.Lock()
+
+    def hit(self, post_id: int):
+        if not self.enabled:
+            return
+        if self._thread is None:
+            self.start()
+        with self._lock:
+            self._pending[post_id] = self._pending.get(post_id, 0) + 1
+
+    def pending(self):
+        return len(self._pending)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="view-counter", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        # Накопленные просмотры сбрасываются до остановки
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stopping.set()
+            thread.join()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.flush()
+                with read_session() as db:
+                    self.refresh(db)
+            except Exception:
+                logger.exception("View counter flush failed")
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Final view counter flush failed")
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        stmt = insert(PostViews)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PostViews.post_id],
+            set_={"views": PostViews.views + stmt.excluded.views}
+        )
+        try:
+            with session() as db:
+                db.execute(stmt, [{"post_id": post_id, "views": views} for post_id, views in sorted(pending.items())])
+                db.commit()
+        except Exception:
+            # Вернем просмотры обратно: попадут в следующий сброс
+            with self._lock:
+                for post_id, views in pending.items():
+                    self._pending[post_id] = self._pending.get(post_id, 0) + views
+            raise
+        return len(pending)
+
+    def refresh(self, db: Session):
+        # JOIN отсекает счетчики удаленных постов; индекс читается с конца,
+        # и запрос останавливается на top_k-й строке
+        rows = db.execute(
+            select(PostViews.post_id, PostViews.views)
+            .join(Post, Post.id == PostViews.post_id)
+            .order_by(PostViews.views.desc(), PostViews.post_id.desc())
+            .limit(self.top_k)
+        ).all()
+        self._top = [(post_id, views) for post_id, views in rows]
+
+    def popular(self, db: Session, limit: int):
+        top = self._top[:limit]
+        if not top:
+            return []
+
+        rows = db.execute(queries.post_columns_select(summary=True).where(Post.id.in_([id for id, _ in top]))).all()
+        posts = {row.id: row for row in rows}
+
+        items = []
+        for post_id, views in top:
+            row = posts.get(post_id)
+            # Пост могли удалить после пересчета рейтинга
+            if row is not None:
+                items.append({**queries.row_dict(row), "views": views})
+        return items
+
+
+view_counter = ViewCounter(VIEWS_FLUSH_INTERVAL, POPULAR_TOP_K, VIEWS_ENABLED)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useCallback } from 'react';
 import { Link, useParams, useNavigate } from 'react-router-dom';
 import { blogAPI } from '../../services/api';
 import { useAuth } from '../context/AuthContext';
@@ -8,35 +8,66 @@ const BlogDetail = () => {
   const navigate = useNavigate();
   const [post, setPost] = useState(null);
   const [comments, setComments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [commentText, setCommentText] = useState('');
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [submitting, setSubmitting] = useState(false);
   const { isAuthenticated, user } = useAuth();
 
-  useEffect(() => {
-    const fetchData = async () => {
-      try {
-        setLoading(true);
-        const postData = await blogAPI.getArticle(id);
-        setPost(postData);
-        try {
-          const commentsData = await blogAPI.getComments(id);
-          setComments(commentsData || []);
-        } catch (commentsError) {
-          console.error('Error loading comments:', commentsError);
-          setComments([]);
-        }
-      } catch (err) {
-        setError('Ошибка при загрузке поста');
-        console.error('Error:', err);
-      } finally {
-        setLoading(false);
-      }
-    };
+  const fetchData = useCallback(async () => {
+    try {
+      // Пост и первая страница комментариев одним запросом
+      const detail = await blogAPI.getArticleDetail(id);
+      setPost(detail.post);
+      setComments(detail.comments || []);
+      setNextCursor(detail.next_comments_cursor);
+    } catch (err) {
+      setError('Ошибка при загрузке поста');
+      console.error('Error:', err);
+    } finally {
+      setLoading(false);
+    }
+  }, [id]);
 
+  useEffect(() => {
+    setLoading(true);
     fetchData();
-  }, [id]);
+  }, [fetchData]);
+
+  // Новые, измененные и удаленные комментарии приходят с сервера сами
+  useEffect(() => {
+    const source = blogAPI.subscribeComments(id);
+
+    source.addEventListener('created', (e) => {
+      const comment = JSON.parse(e.data);
+      setComments(prev => prev.some(c => c.id === comment.id) ? prev : [comment, ...prev]);
+      setPost(prev => prev && { ...prev, comments_count: prev.comments_count + 1 });
+    });
+    source.addEventListener('updated', (e) => {
+      const comment = JSON.parse(e.data);
+      setComments(prev => prev.map(c => c.id === comment.id ? comment : c));
+    });
+    source.addEventListener('deleted', (e) => {
+      const { id: commentId } = JSON.parse(e.data);
+      setComments(prev => prev.filter(c => c.id !== commentId));
+      setPost(prev => prev && { ...prev, comments_count: Math.max(0, prev.comments_count - 1) });
+    });
+    // Пропущенные события не восстановить: перечитываем пост и первую страницу
+    source.addEventListener('reset', () => fetchData());
+
+    return () => source.close();
+  }, [id, fetchData]);
+
+  const loadMoreComments = async () => {
+    try {
+      const page = await blogAPI.getCommentsPage(id, nextCursor);
+      setComments(prev => [...prev, ...page.items]);
+      setNextCursor(page.next);
+    } catch (err) {
+      console.error('Error loading comments:', err);
+    }
+  };
 
   const handleSubmitComment = async (e) => {
     e.preventDefault();
@@ -49,17 +80,14 @@ const BlogDetail = () => {
         post_id: parseInt(id),
         author_id: user.id
       });
-      window.location.reload();
-      
+      // Сам комментарий придет событием created
+      setCommentText('');
+
     } catch (err) {
       console.error('Error creating comment:', err);
       console.error('Error response:', err.response);
 
-      if (err.response?.status !== 201) {
-        alert('Ошибка при отправке комментария: ' + (err.response?.data?.detail || 'Неизвестная ошибка'));
-      } else {
-        window.location.reload();
-      }
+      alert('Ошибка при отправке комментария: ' + (err.response?.data?.detail || 'Неизвестная ошибка'));
     } finally {
       setSubmitting(false);
     }
@@ -69,7 +97,7 @@ const BlogDetail = () => {
     if (window.confirm('Вы уверены, что хотите удалить этот комментарий?')) {
       try {
         await blogAPI.deleteComment(commentId);
-        window.location.reload();
+        setComments(prev => prev.filter(c => c.id !== commentId));
       } catch (err) {
         console.error('Error deleting comment:', err);
         alert('Ошибка при удалении комментария');
@@ -206,6 +234,12 @@ const BlogDetail = () => {
             <p style={{ color: '#666', textAlign: 'center' }}>Комментариев пока нет</p>
           )}
 
+          {nextCursor && (
+            <button className="btn ghost" onClick={loadMoreComments}>
+              Показать еще
+            </button>
+          )}
+
           {isAuthenticated ? (
             <div className="comment-form" style={{ marginTop: '30px' }}>
               <h4>Оставить комментарий</h4>
@@ -5,6 +5,8 @@ import { useAuth } from '../context/AuthContext';
 
 const BlogList = ({ category = null }) => {
   const [posts, setPosts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [pageCategory, setPageCategory] = useState(null);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -16,10 +18,14 @@ const BlogList = ({ category = null }) => {
       try {
         setLoading(true);
         
-        const categoriesData = await blogAPI.getCategories();
+        // Сводка сразу содержит число постов, отдельные запросы не нужны
+        const summary = await blogAPI.getCategorySummary();
+        const categoriesData = summary
+          .filter(cat => cat.count > 0)
+          .map(cat => ({ value: cat.name, name: `${cat.name} (${cat.count})` }));
         setCategories(categoriesData);
         
-        let postsData;
+        let listCategory = null;
         if (category) {
           const validCategories = categoriesData.map(cat => 
             typeof cat === 'object' ? cat.value : cat
@@ -27,15 +33,15 @@ const BlogList = ({ category = null }) => {
           
           if (!validCategories.includes(category)) {
             setMessage(`Категория '${category}' не найдена`);
-            postsData = await blogAPI.getArticles();
           } else {
-            postsData = await blogAPI.getArticlesByCategory(category);
+            listCategory = category;
           }
-        } else {
-          postsData = await blogAPI.getArticles();
         }
         
-        setPosts(postsData);
+        const page = await blogAPI.getArticlesPage(listCategory);
+        setPosts(page.items);
+        setNextCursor(page.next);
+        setPageCategory(listCategory);
       } catch (err) {
         setError('Ошибка при загрузке постов');
         console.error('Error:', err);
@@ -47,6 +53,16 @@ const BlogList = ({ category = null }) => {
     fetchData();
   }, [category]);
 
+  const loadMorePosts = async () => {
+    try {
+      const page = await blogAPI.getArticlesPage(pageCategory, nextCursor);
+      setPosts(prev => [...prev, ...page.items]);
+      setNextCursor(page.next);
+    } catch (err) {
+      console.error('Error loading posts:', err);
+    }
+  };
+
   const handleDeletePost = async (postId) => {
     if (window.confirm('Вы уверены, что хотите удалить этот пост?')) {
       try {
@@ -130,7 +146,7 @@ const BlogList = ({ category = null }) => {
                   minute: '2-digit'
                 })}
               </p>
-              <p>{post.content?.substring(0, 150)}...</p>
+              <p>{post.excerpt}...</p>
               <p><Link to={`/blog/${post.id}`}>Комментарии ({post.comments_count || 0})</Link></p>
               
               {canModifyPost(post) && (
@@ -161,6 +177,12 @@ const BlogList = ({ category = null }) => {
           {posts.length === 0 && (
             <p>Постов пока нет.</p>
           )}
+
+          {nextCursor && (
+            <button className="btn ghost" onClick={loadMorePosts}>
+              Показать еще
+            </button>
+          )}
         </div>
       </div>
     </section>
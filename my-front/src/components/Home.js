@@ -5,6 +5,7 @@ import avatar from '../assets/avatar.jpg';
 
 const Home = () => {
   const [latestPosts, setLatestPosts] = useState([]);
+  const [popularPosts, setPopularPosts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -12,8 +13,8 @@ const Home = () => {
     const fetchLatestPosts = async () => {
       try {
         setLoading(true);
-        const posts = await blogAPI.getArticles();
-        setLatestPosts(posts.slice(0, 2)); // Берем только 2 последних поста
+        const posts = await blogAPI.getLatestArticles(2); // Берем только 2 последних поста
+        setLatestPosts(posts);
       } catch (err) {
         setError('Ошибка при загрузке постов');
         console.error('Error fetching posts:', err);
@@ -23,6 +24,11 @@ const Home = () => {
     };
 
     fetchLatestPosts();
+
+    // Самые читаемые посты; без них главная страница работает как раньше
+    blogAPI.getPopularArticles(5)
+      .then(setPopularPosts)
+      .catch(err => console.error('Error fetching popular posts:', err));
   }, []);
 
   const isNewPost = (createdAt) => {
@@ -87,7 +93,7 @@ const Home = () => {
                     minute: '2-digit'
                   })}
                 </p>
-                <p>{post.content.substring(0, 150)}...</p>
+                <p>{post.excerpt}...</p>
                 <p><Link to={`/blog/${post.id}`}>Комментарии ({post.comments_count || 0})</Link></p>
               </article>
             ))}
@@ -105,6 +111,22 @@ const Home = () => {
         </div>
       </section>
 
+      {popularPosts.length > 0 && (
+        <section id="popular" className="blog">
+          <div className="container">
+            <h2>Самое читаемое</h2>
+            <ol className="posts">
+              {popularPosts.map(post => (
+                <li key={post.id}>
+                  <Link to={`/blog/${post.id}`}>{post.title}</Link>
+                  <span className="meta"> · {post.category} · просмотров: {post.views}</span>
+                </li>
+              ))}
+            </ol>
+          </div>
+        </section>
+      )}
+
       <section id="contact" className="contact">
         <div className="container">
           <h2>Контакты</h2>
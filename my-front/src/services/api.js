@@ -108,19 +108,30 @@ export const authAPI = {
 
 // Посты и комментарии
 export const blogAPI = {
-  getArticles: () => apiService.get('/articles/'),
+  // Список постраничный: превью постов и курсор следующей страницы
+  getArticlesPage: (category, cursor, limit = 20) => api
+    .get(category ? `/articles/category/${category}` : '/articles/', { params: { limit, cursor, summary: true } })
+    .then(response => ({ items: response.data, next: response.headers['x-next-cursor'] || null })),
+  getLatestArticles: (limit) => apiService.get(`/articles/?limit=${limit}&summary=true`),
+  getPopularArticles: (limit) => apiService.get(`/articles/popular?limit=${limit}`),
   getArticle: (id) => apiService.get(`/articles/${id}`),
-  getArticlesByCategory: (category) => apiService.get(`/articles/category/${category}`),
+  getArticleDetail: (id) => apiService.get(`/articles/${id}/detail`),
   createArticle: (data) => apiService.post('/articles/', data),
   updateArticle: (id, data) => apiService.put(`/articles/${id}`, data),
   deleteArticle: (id) => apiService.delete(`/articles/${id}`),
   
   getComments: (postId) => apiService.get(`/articles/${postId}/comments`),
+  getCommentsPage: (postId, cursor, limit = 20) => api
+    .get(`/articles/${postId}/comments`, { params: { limit, cursor } })
+    .then(response => ({ items: response.data, next: response.headers['x-next-cursor'] || null })),
   createComment: (data) => apiService.post('/comments/', data),
   updateComment: (id, data) => apiService.put(`/comments/${id}`, data),
   deleteComment: (id) => apiService.delete(`/comments/${id}`),
+  // SSE: токен уходит в куке, заголовок Authorization EventSource не умеет
+  subscribeComments: (postId) => new EventSource(`${API_URL}/articles/${postId}/comments/live`, { withCredentials: true }),
   
   getCategories: () => apiService.get('/categories/'),
+  getCategorySummary: () => apiService.get('/categories/summary'),
 };
 
 export default api;
\ No newline at end of file